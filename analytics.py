@@ -4,142 +4,191 @@ Provides advanced analytics and reporting for the blockchain
 """
 
 import datetime as dt
-from collections import defaultdict, Counter
+from collections import Counter
+import heapq
 import json
+from attendance_matrix import HAVE_NUMPY, AttendanceMatrix
+from verifier import should_verify_in_parallel, find_invalid_blocks
 
-def get_attendance_analytics(blockchain):
+class AnalyticsState:
     """
-    Generate comprehensive attendance analytics
+    Running attendance aggregates, updated one block at a time so analytics
+    requests don't rescan the chain. Sets and dicts are filled in chain order,
+    so to_dict() matches a full rebuild exactly.
     """
-    analytics = {
-        "overview": {
-            "total_blocks": len(blockchain),
-            "attendance_blocks": 0,
-            "total_students_recorded": 0,
-            "unique_teachers": set(),
-            "unique_courses": set(),
-            "date_range": {"start": None, "end": None}
-        },
-        "by_teacher": defaultdict(lambda: {
-            "total_classes": 0,
-            "total_students": 0,
-            "courses": set(),
-            "dates": []
-        }),
-        "by_course": defaultdict(lambda: {
-            "total_classes": 0,
-            "total_students": 0,
-            "teachers": set(),
-            "dates": []
-        }),
-        "by_date": defaultdict(lambda: {
-            "classes": 0,
-            "students": 0,
-            "teachers": set(),
-            "courses": set()
-        }),
-        "student_attendance": defaultdict(int),
-        "trends": {
-            "daily_attendance": [],
-            "course_popularity": [],
-            "teacher_activity": []
-        }
-    }
-    
-    dates = []
-    
-    for block in blockchain:
+
+    def __init__(self):
+        self.total_blocks = 0
+        self.attendance_blocks = 0
+        self.total_students_recorded = 0
+        self.unique_teachers = set()
+        self.unique_courses = set()
+        self.first_date = None
+        self.last_date = None
+        self.by_teacher = {}
+        self.by_course = {}
+        self.by_date = {}
+        self.student_attendance = {}
+
+    @classmethod
+    def from_chain(cls, chain):
+        state = cls()
+        state.rebuild(chain)
+        return state
+
+    def rebuild(self, chain):
+        """
+        Replace the aggregates with ones computed over the given chain
+        """
+        self.__init__()
+        for block in chain:
+            self.add_block(block)
+
+    def copy(self):
+        """
+        Independent copy of the aggregates, so they can be rendered while this
+        state keeps taking new blocks
+        """
+        state = AnalyticsState()
+        state.__dict__.update(self.__dict__)
+        state.unique_teachers = set(self.unique_teachers)
+        state.unique_courses = set(self.unique_courses)
+        state.by_teacher = {teacher: dict(stats, courses=set(stats["courses"]), dates=list(stats["dates"]))
+                            for teacher, stats in self.by_teacher.items()}
+        state.by_course = {course: dict(stats, teachers=set(stats["teachers"]), dates=list(stats["dates"]))
+                           for course, stats in self.by_course.items()}
+        state.by_date = {date: dict(stats, teachers=set(stats["teachers"]), courses=set(stats["courses"]))
+                         for date, stats in self.by_date.items()}
+        state.student_attendance = dict(self.student_attendance)
+        return state
+
+    def add_block(self, block):
+        """
+        Fold one block into the aggregates in O(students in the block)
+        """
+        self.total_blocks += 1
         if block.index == 0:  # Skip genesis block
-            continue
-            
-        if block.data.get('type') == 'attendance':
-            analytics["overview"]["attendance_blocks"] += 1
-            
-            teacher = block.data.get('teacher_name', 'Unknown')
-            course = block.data.get('course', 'Unknown')
-            date = block.data.get('date', '')
-            students = block.data.get('present_students', [])
-            
-            # Update overview
-            analytics["overview"]["total_students_recorded"] += len(students)
-            analytics["overview"]["unique_teachers"].add(teacher)
-            analytics["overview"]["unique_courses"].add(course)
-            
-            if date:
-                dates.append(date)
-            
-            # Update teacher analytics
-            analytics["by_teacher"][teacher]["total_classes"] += 1
-            analytics["by_teacher"][teacher]["total_students"] += len(students)
-            analytics["by_teacher"][teacher]["courses"].add(course)
-            analytics["by_teacher"][teacher]["dates"].append(date)
-            
-            # Update course analytics
-            analytics["by_course"][course]["total_classes"] += 1
-            analytics["by_course"][course]["total_students"] += len(students)
-            analytics["by_course"][course]["teachers"].add(teacher)
-            analytics["by_course"][course]["dates"].append(date)
-            
-            # Update date analytics
-            analytics["by_date"][date]["classes"] += 1
-            analytics["by_date"][date]["students"] += len(students)
-            analytics["by_date"][date]["teachers"].add(teacher)
-            analytics["by_date"][date]["courses"].add(course)
-            
-            # Update student attendance count
-            for student in students:
-                analytics["student_attendance"][student] += 1
-    
-    # Convert sets to lists for JSON serialization
-    analytics["overview"]["unique_teachers"] = list(analytics["overview"]["unique_teachers"])
-    analytics["overview"]["unique_courses"] = list(analytics["overview"]["unique_courses"])
-    
-    # Set date range
-    if dates:
-        analytics["overview"]["date_range"]["start"] = min(dates)
-        analytics["overview"]["date_range"]["end"] = max(dates)
-    
-    # Convert defaultdicts to regular dicts and sets to lists
-    analytics["by_teacher"] = {k: {
-        "total_classes": v["total_classes"],
-        "total_students": v["total_students"],
-        "courses": list(v["courses"]),
-        "dates": v["dates"],
-        "avg_students_per_class": v["total_students"] / v["total_classes"] if v["total_classes"] > 0 else 0
-    } for k, v in analytics["by_teacher"].items()}
-    
-    analytics["by_course"] = {k: {
-        "total_classes": v["total_classes"],
-        "total_students": v["total_students"],
-        "teachers": list(v["teachers"]),
-        "dates": v["dates"],
-        "avg_students_per_class": v["total_students"] / v["total_classes"] if v["total_classes"] > 0 else 0
-    } for k, v in analytics["by_course"].items()}
-    
-    analytics["by_date"] = {k: {
-        "classes": v["classes"],
-        "students": v["students"],
-        "teachers": list(v["teachers"]),
-        "courses": list(v["courses"])
-    } for k, v in analytics["by_date"].items()}
-    
-    # Generate trends
+            return
+        if not isinstance(block.data, dict) or block.data.get('type') != 'attendance':
+            return
+
+        self.attendance_blocks += 1
+
+        teacher = block.data.get('teacher_name', 'Unknown')
+        course = block.data.get('course', 'Unknown')
+        date = block.data.get('date', '')
+        students = block.data.get('present_students', [])
+
+        # Update overview
+        self.total_students_recorded += len(students)
+        self.unique_teachers.add(teacher)
+        self.unique_courses.add(course)
+
+        if date:
+            if self.first_date is None or date < self.first_date:
+                self.first_date = date
+            if self.last_date is None or date > self.last_date:
+                self.last_date = date
+
+        # Update teacher analytics
+        teacher_stats = self.by_teacher.setdefault(teacher, {
+            "total_classes": 0, "total_students": 0, "courses": set(), "dates": []})
+        teacher_stats["total_classes"] += 1
+        teacher_stats["total_students"] += len(students)
+        teacher_stats["courses"].add(course)
+        teacher_stats["dates"].append(date)
+
+        # Update course analytics
+        course_stats = self.by_course.setdefault(course, {
+            "total_classes": 0, "total_students": 0, "teachers": set(), "dates": []})
+        course_stats["total_classes"] += 1
+        course_stats["total_students"] += len(students)
+        course_stats["teachers"].add(teacher)
+        course_stats["dates"].append(date)
+
+        # Update date analytics
+        date_stats = self.by_date.setdefault(date, {
+            "classes": 0, "students": 0, "teachers": set(), "courses": set()})
+        date_stats["classes"] += 1
+        date_stats["students"] += len(students)
+        date_stats["teachers"].add(teacher)
+        date_stats["courses"].add(course)
+
+        # Update student attendance count
+        student_attendance = self.student_attendance
+        for student in students:
+            student_attendance[student] = student_attendance.get(student, 0) + 1
+
+    def to_dict(self):
+        """
+        Build the analytics in the layout get_attendance_analytics returns
+        """
+        analytics = {
+            "overview": {
+                "total_blocks": self.total_blocks,
+                "attendance_blocks": self.attendance_blocks,
+                "total_students_recorded": self.total_students_recorded,
+                "unique_teachers": list(self.unique_teachers),
+                "unique_courses": list(self.unique_courses),
+                "date_range": {"start": self.first_date, "end": self.last_date}
+            },
+            "by_teacher": {k: {
+                "total_classes": v["total_classes"],
+                "total_students": v["total_students"],
+                "courses": list(v["courses"]),
+                "dates": list(v["dates"]),
+                "avg_students_per_class": v["total_students"] / v["total_classes"] if v["total_classes"] > 0 else 0
+            } for k, v in self.by_teacher.items()},
+            "by_course": {k: {
+                "total_classes": v["total_classes"],
+                "total_students": v["total_students"],
+                "teachers": list(v["teachers"]),
+                "dates": list(v["dates"]),
+                "avg_students_per_class": v["total_students"] / v["total_classes"] if v["total_classes"] > 0 else 0
+            } for k, v in self.by_course.items()},
+            "by_date": {k: {
+                "classes": v["classes"],
+                "students": v["students"],
+                "teachers": list(v["teachers"]),
+                "courses": list(v["courses"])
+            } for k, v in self.by_date.items()},
+            "student_attendance": dict(self.student_attendance),
+            "trends": {}
+        }
+        return _add_trends(analytics)
+
+def _add_trends(analytics):
+    """
+    Fill in the trends from the per-date, per-course and per-teacher analytics
+    """
+    analytics["trends"]["daily_attendance"] = sorted(
+        [(date, data["students"]) for date, data in analytics["by_date"].items()]
+    )
+
     analytics["trends"]["course_popularity"] = sorted(
         [(course, data["total_students"]) for course, data in analytics["by_course"].items()],
         key=lambda x: x[1], reverse=True
     )
-    
+
     analytics["trends"]["teacher_activity"] = sorted(
         [(teacher, data["total_classes"]) for teacher, data in analytics["by_teacher"].items()],
         key=lambda x: x[1], reverse=True
     )
-    
-    analytics["trends"]["daily_attendance"] = sorted(
-        [(date, data["students"]) for date, data in analytics["by_date"].items()]
-    )
-    
+
     return analytics
 
+def get_attendance_analytics(blockchain, state=None):
+    """
+    Generate comprehensive attendance analytics.
+    Pass the AnalyticsState kept alongside the chain to skip the rescan; without
+    one the chain is scanned into an AttendanceMatrix when NumPy is available.
+    """
+    if state is None and HAVE_NUMPY:
+        return _add_trends(AttendanceMatrix(blockchain).to_analytics())
+    if state is None:
+        state = AnalyticsState.from_chain(blockchain)
+    return state.to_dict()
+
 def get_blockchain_health(blockchain):
     """
     Analyze blockchain health and integrity metrics
@@ -166,9 +215,14 @@ def get_blockchain_health(blockchain):
     total_size = 0
     timestamps = []
     
+    # Hash long chains in parallel up front instead of calling is_valid() per block
+    invalid_blocks = None
+    if should_verify_in_parallel(blockchain):
+        invalid_blocks = set(find_invalid_blocks(blockchain))
+    
     for i, block in enumerate(blockchain):
         # Check block validity
-        if block.is_valid():
+        if (i not in invalid_blocks) if invalid_blocks is not None else block.is_valid():
             health["integrity"]["valid_blocks"] += 1
         else:
             health["integrity"]["invalid_blocks"] += 1
@@ -179,7 +233,7 @@ def get_blockchain_health(blockchain):
                 health["integrity"]["broken_links"] += 1
         
         # Calculate block size (approximate)
-        block_size = len(json.dumps(block.to_dict(), default=str))
+        block_size = block.serialized_size()
         total_size += block_size
         
         # Collect timestamps
@@ -209,11 +263,16 @@ def get_blockchain_health(blockchain):
     
     return health
 
-def generate_attendance_report(blockchain, format="text"):
+def generate_attendance_report(blockchain, format="text", state=None):
     """
     Generate a comprehensive attendance report
     """
-    analytics = get_attendance_analytics(blockchain)
+    matrix = None
+    if state is None and HAVE_NUMPY:
+        matrix = AttendanceMatrix(blockchain)
+        analytics = _add_trends(matrix.to_analytics())
+    else:
+        analytics = get_attendance_analytics(blockchain, state)
     
     if format == "json":
         return json.dumps(analytics, indent=2, default=str)
@@ -250,31 +309,49 @@ def generate_attendance_report(blockchain, format="text"):
     
     # Most active students
     report.append(f"\nMOST ACTIVE STUDENTS:")
-    top_students = sorted(analytics["student_attendance"].items(), 
-                         key=lambda x: x[1], reverse=True)[:10]
+    if matrix is not None:
+        top_students = matrix.top_students(10)
+    else:
+        # nlargest gives the same order as a full sort, without sorting every student
+        top_students = heapq.nlargest(10, analytics["student_attendance"].items(), key=lambda x: x[1])
     for student, count in top_students:
         report.append(f"  {student}: {count} attendances")
     
     return "\n".join(report)
 
-def export_analytics(blockchain, filename="blockchain_analytics.json"):
+def build_analytics_export(blockchain, state=None, analytics=None):
+    """
+    Collect the analytics, health metrics and chain summary that export_analytics writes.
+    analytics can be passed in when it was already computed for this chain.
+    """
+    if analytics is None:
+        analytics = get_attendance_analytics(blockchain, state)
+    health = get_blockchain_health(blockchain)
+    
+    return {
+        "generated_at": str(dt.datetime.now()),
+        "blockchain_stats": {
+            "total_blocks": len(blockchain),
+            "genesis_hash": blockchain[0].hash if blockchain else None,
+            "latest_hash": blockchain[-1].hash if blockchain else None
+        },
+        "analytics": analytics,
+        "health": health
+    }
+
+def iter_analytics_json(blockchain, state=None, analytics=None):
+    """
+    Yield the analytics export as JSON text, piece by piece
+    """
+    export_data = build_analytics_export(blockchain, state, analytics)
+    return json.JSONEncoder(indent=2, default=str).iterencode(export_data)
+
+def export_analytics(blockchain, filename="blockchain_analytics.json", state=None, analytics=None):
     """
     Export comprehensive analytics to file
     """
     try:
-        analytics = get_attendance_analytics(blockchain)
-        health = get_blockchain_health(blockchain)
-        
-        export_data = {
-            "generated_at": str(dt.datetime.now()),
-            "blockchain_stats": {
-                "total_blocks": len(blockchain),
-                "genesis_hash": blockchain[0].hash if blockchain else None,
-                "latest_hash": blockchain[-1].hash if blockchain else None
-            },
-            "analytics": analytics,
-            "health": health
-        }
+        export_data = build_analytics_export(blockchain, state, analytics)
         
         with open(filename, 'w') as f:
             json.dump(export_data, f, indent=2, default=str)
@@ -0,0 +1,200 @@
+"""
+Blockchain Attendance Matrix Module
+Student-by-session attendance matrix with vectorized reductions for reporting.
+NumPy is optional; without it analytics and reports are built by AnalyticsState
+and attendance rates by a pure-Python scan.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAVE_NUMPY = np is not None
+
+
+def _is_session(block):
+    return (block.index != 0 and
+            isinstance(block.data, dict) and
+            block.data.get('type') == 'attendance')
+
+
+def _encode(codes, value):
+    return codes.setdefault(value, len(codes))
+
+
+def _ranked(names, totals, limit=None):
+    """
+    Pair names with totals, largest first; ties keep first-seen order like sorted()
+    """
+    order = np.argsort(-totals, kind='stable')
+    if limit is not None:
+        order = order[:limit]
+    return [(names[i], int(totals[i])) for i in order]
+
+
+class AttendanceMatrix:
+    """
+    Sparse student-by-session matrix in CSR layout: the students present in
+    session i are students[session_offsets[i]:session_offsets[i + 1]].
+    Each session's teacher, course and date are categorical codes; every
+    category lists its values in order of first appearance in the chain.
+    """
+
+    def __init__(self, chain):
+        if np is None:
+            raise RuntimeError("NumPy is required for AttendanceMatrix")
+
+        teacher_codes, course_codes, date_codes, student_codes = {}, {}, {}, {}
+        teachers, courses, dates, offsets, students = [], [], [], [0], []
+
+        for block in chain:
+            if not _is_session(block):
+                continue
+            teachers.append(_encode(teacher_codes, block.data.get('teacher_name', 'Unknown')))
+            courses.append(_encode(course_codes, block.data.get('course', 'Unknown')))
+            dates.append(_encode(date_codes, block.data.get('date', '')))
+            students.extend(_encode(student_codes, student)
+                            for student in block.data.get('present_students', []))
+            offsets.append(len(students))
+
+        self.total_blocks = len(chain)
+        self.teacher_names = list(teacher_codes)
+        self.course_names = list(course_codes)
+        self.date_names = list(date_codes)
+        self.student_names = list(student_codes)
+
+        self.teachers = np.array(teachers, dtype=np.int64)
+        self.courses = np.array(courses, dtype=np.int64)
+        self.dates = np.array(dates, dtype=np.int64)
+        self.session_offsets = np.array(offsets, dtype=np.int64)
+        self.students = np.array(students, dtype=np.int64)
+        self.session_sizes = np.diff(self.session_offsets)
+
+    def __len__(self):
+        return len(self.teachers)
+
+    def student_counts(self):
+        return np.bincount(self.students, minlength=len(self.student_names))
+
+    def _groups(self, codes, size):
+        """
+        Positions of the sessions with each category value, in chain order
+        """
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=size))
+        return np.split(order, bounds[:-1])
+
+    def _first_seen(self, names, codes):
+        """
+        Set of the values behind codes, filled in order of first appearance
+        like the sets AnalyticsState keeps
+        """
+        _, first = np.unique(codes, return_index=True)
+        return set(names[code] for code in codes[np.sort(first)])
+
+    def _dates(self, positions):
+        return [self.date_names[code] for code in self.dates[positions]]
+
+    def to_analytics(self):
+        """
+        The analytics in the layout of AnalyticsState.to_dict(), without the trends
+        """
+        dated = [date for date in self.date_names if date]
+        teacher_groups = self._groups(self.teachers, len(self.teacher_names))
+        course_groups = self._groups(self.courses, len(self.course_names))
+        date_groups = self._groups(self.dates, len(self.date_names))
+
+        by_teacher = {}
+        for teacher, positions in zip(self.teacher_names, teacher_groups):
+            classes, students = len(positions), int(self.session_sizes[positions].sum())
+            by_teacher[teacher] = {
+                "total_classes": classes,
+                "total_students": students,
+                "courses": list(self._first_seen(self.course_names, self.courses[positions])),
+                "dates": self._dates(positions),
+                "avg_students_per_class": students / classes
+            }
+
+        by_course = {}
+        for course, positions in zip(self.course_names, course_groups):
+            classes, students = len(positions), int(self.session_sizes[positions].sum())
+            by_course[course] = {
+                "total_classes": classes,
+                "total_students": students,
+                "teachers": list(self._first_seen(self.teacher_names, self.teachers[positions])),
+                "dates": self._dates(positions),
+                "avg_students_per_class": students / classes
+            }
+
+        by_date = {}
+        for date, positions in zip(self.date_names, date_groups):
+            by_date[date] = {
+                "classes": len(positions),
+                "students": int(self.session_sizes[positions].sum()),
+                "teachers": list(self._first_seen(self.teacher_names, self.teachers[positions])),
+                "courses": list(self._first_seen(self.course_names, self.courses[positions]))
+            }
+
+        return {
+            "overview": {
+                "total_blocks": self.total_blocks,
+                "attendance_blocks": len(self),
+                "total_students_recorded": len(self.students),
+                "unique_teachers": list(set(self.teacher_names)),
+                "unique_courses": list(set(self.course_names)),
+                "date_range": {"start": min(dated) if dated else None, "end": max(dated) if dated else None}
+            },
+            "by_teacher": by_teacher,
+            "by_course": by_course,
+            "by_date": by_date,
+            "student_attendance": {name: int(count) for name, count in zip(self.student_names, self.student_counts())},
+            "trends": {}
+        }
+
+    def top_students(self, k=10):
+        return _ranked(self.student_names, self.student_counts(), k)
+
+    def attendance_rates(self):
+        """
+        Attendances of each student divided by the sessions held in the courses
+        that student attended
+        """
+        num_courses = max(len(self.course_names), 1)
+        course_classes = np.bincount(self.courses, minlength=len(self.course_names))
+
+        # Course of the session behind every mark, then one pair per (student, course)
+        mark_courses = np.repeat(self.courses, self.session_sizes)
+        pairs = np.unique(self.students * num_courses + mark_courses)
+        held = np.bincount(pairs // num_courses, weights=course_classes[pairs % num_courses],
+                           minlength=len(self.student_names))
+
+        return {name: float(count / sessions)
+                for name, count, sessions in zip(self.student_names, self.student_counts(), held)}
+
+
+def _python_attendance_rates(chain):
+    course_classes, student_counts, student_courses = {}, {}, {}
+    for block in chain:
+        if not _is_session(block):
+            continue
+        course = block.data.get('course', 'Unknown')
+        course_classes[course] = course_classes.get(course, 0) + 1
+        for student in block.data.get('present_students', []):
+            student_counts[student] = student_counts.get(student, 0) + 1
+            student_courses.setdefault(student, set()).add(course)
+
+    return {student: count / sum(course_classes[course] for course in student_courses[student])
+            for student, count in student_counts.items()}
+
+
+def get_attendance_rates(chain, use_numpy=None):
+    """
+    Per-student attendance rates, in order of first appearance. Uses the
+    attendance matrix when NumPy is available; the numbers are the same either way.
+    """
+    if use_numpy is None:
+        use_numpy = HAVE_NUMPY
+    if use_numpy:
+        return AttendanceMatrix(chain).attendance_rates()
+    return _python_attendance_rates(chain)
@@ -0,0 +1,270 @@
+"""
+Blockchain Backup Store Module
+Incremental, compressed and content-addressed backups tracked by a manifest
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import datetime as dt
+
+MANIFEST_FILE = "manifest.jsonl"
+OBJECTS_DIR = "objects"
+
+# Manifest written before it became append-only, migrated on first load
+OLD_MANIFEST_FILE = "manifest.json"
+
+# Full JSON copies written before the manifest existed
+LEGACY_PREFIX = "blockchain_backup_"
+LEGACY_SUFFIX = ".json"
+
+
+class BackupStore:
+    """
+    Each backup stores only the blocks added since an earlier backup of the same
+    chain as a gzip-compressed chunk named after the SHA-256 of its content.
+
+    Chunks are merged like a binary counter: a new chunk starts at level 0 and
+    absorbs the trailing chunks of its base while they sit at the same level,
+    moving up one level each time. A backup therefore references O(log n)
+    chunks and every block is rewritten at most O(log n) times.
+
+    The manifest is append-only, one JSON line per backup naming its base, how
+    many of the base's chunks it keeps and the chunk it adds. It is only
+    rewritten when old backups are removed.
+    """
+
+    def __init__(self, backup_dir):
+        self.backup_dir = backup_dir
+        self.objects_dir = os.path.join(backup_dir, OBJECTS_DIR)
+        self.manifest_path = os.path.join(backup_dir, MANIFEST_FILE)
+        self.entries = []
+        self._by_name = {}
+        self._load_manifest()
+
+    def _add_entry(self, entry):
+        self.entries.append(entry)
+        self._by_name[entry["name"]] = entry
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn last line from an interrupted backup
+                        continue
+                    self._add_entry(self._resolve(record))
+            return
+
+        # First load: import the old manifest and legacy full copies once
+        old_path = os.path.join(self.backup_dir, OLD_MANIFEST_FILE)
+        if os.path.exists(old_path):
+            with open(old_path, 'r') as f:
+                for entry in json.load(f)["backups"]:
+                    # Chunk offsets were not recorded, so these never serve as a base
+                    entry["chunks"] = [{"digest": digest, "start": None, "level": None}
+                                       for digest in entry["chunks"]]
+                    self._add_entry(entry)
+        for entry in self._legacy_backups():
+            self._add_entry(entry)
+        if self.entries:
+            self._write_manifest()
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+    def _resolve(self, record):
+        """
+        Turn a manifest line into an entry with its full chunk list
+        """
+        if "chunks" not in record:
+            chunks = self._by_name[record.pop("base")]["chunks"][:record.pop("keep")] if record.get("base") else []
+            chunk = record.pop("chunk")
+            record.pop("base", None)
+            record.pop("keep", None)
+            record["chunks"] = chunks + [chunk] if chunk else chunks
+        return record
+
+    def _write_manifest(self):
+        os.makedirs(self.backup_dir, exist_ok=True)
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        os.replace(temp_path, self.manifest_path)
+
+    def _append_manifest(self, record):
+        os.makedirs(self.backup_dir, exist_ok=True)
+        with open(self.manifest_path, 'a') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + "\n")
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, f"{digest}.json.gz")
+
+    def _write_object(self, records):
+        """
+        Store a chunk of block records, returning its digest and the bytes written
+        """
+        payload = json.dumps(records, separators=(',', ':'), default=str).encode('utf-8')
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            # Identical chunk already stored by another backup
+            return digest, 0
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        temp_path = path + ".tmp"
+        with gzip.open(temp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+        return digest, os.path.getsize(path)
+
+    def _read_object(self, digest):
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return json.loads(f.read().decode('utf-8'))
+
+    def _find_base(self, blockchain):
+        """
+        Find the newest backup whose blocks are a prefix of the given chain
+        """
+        for entry in reversed(self.entries):
+            total = entry["total_blocks"]
+            if entry["chunks"] is None or total is None:
+                continue
+            if total <= len(blockchain) and blockchain[total - 1].hash == entry["tip_hash"]:
+                return entry
+        return None
+
+    def _unique_name(self, now):
+        name = f"blockchain_backup_{now.strftime('%Y%m%d_%H%M%S')}"
+        suffix = 1
+        candidate = name
+        while candidate in self._by_name:
+            candidate = f"{name}_{suffix}"
+            suffix += 1
+        return candidate
+
+    def create_backup(self, blockchain):
+        """
+        Record a backup of the chain, storing only blocks not covered by an earlier backup
+        """
+        base = self._find_base(blockchain)
+        chunks = list(base["chunks"]) if base else []
+        if any(chunk["start"] is None for chunk in chunks):
+            # Migrated backups can't be merged into, so start over with the whole chain
+            chunks = []
+
+        chunk, size = None, 0
+        start = base["total_blocks"] if chunks else 0
+        if start < len(blockchain):
+            # Merge trailing chunks of the same level into the new one
+            level = 0
+            while chunks and chunks[-1]["level"] == level:
+                start = chunks.pop()["start"]
+                level += 1
+            digest, size = self._write_object([block.to_dict() for block in blockchain[start:]])
+            chunk = {"digest": digest, "start": start, "level": level}
+
+        now = dt.datetime.now()
+        record = {
+            "name": self._unique_name(now),
+            "created": str(now),
+            "total_blocks": len(blockchain),
+            "tip_hash": blockchain[-1].hash if blockchain else None,
+            "size": size,
+            "base": base["name"] if chunks else None,
+            "keep": len(chunks),
+            "chunk": chunk
+        }
+        self._append_manifest(record)
+        entry = self._resolve(record)
+        self._add_entry(entry)
+        return entry
+
+    def get_entry(self, name):
+        return self._by_name.get(name)
+
+    def _legacy_backups(self):
+        backups = []
+        if not os.path.isdir(self.backup_dir):
+            return backups
+        for filename in os.listdir(self.backup_dir):
+            if filename.startswith(LEGACY_PREFIX) and filename.endswith(LEGACY_SUFFIX):
+                stat = os.stat(os.path.join(self.backup_dir, filename))
+                backups.append({
+                    "name": filename,
+                    "created": str(dt.datetime.fromtimestamp(stat.st_mtime)),
+                    "total_blocks": None,
+                    "tip_hash": None,
+                    "size": stat.st_size,
+                    "chunks": None
+                })
+        backups.sort(key=lambda backup: backup["created"])
+        return backups
+
+    def list_backups(self):
+        """
+        List backups from the manifest, legacy full copies included, newest first
+        """
+        backups = []
+        for entry in self.entries:
+            legacy = entry["chunks"] is None
+            backups.append({
+                'filename': entry["name"],
+                'filepath': os.path.join(self.backup_dir, entry["name"]) if legacy else self.manifest_path,
+                'size': entry["size"],
+                'created': dt.datetime.fromisoformat(entry["created"]),
+                'total_blocks': entry["total_blocks"],
+                'chunks': None if legacy else len(entry["chunks"])
+            })
+        backups.sort(key=lambda backup: backup['created'], reverse=True)
+        return backups
+
+    def iter_records(self, name):
+        """
+        Yield the block records of a backup, in chain order
+        """
+        entry = self.get_entry(name)
+        if entry is None or entry["chunks"] is None:
+            raise KeyError(f"Backup {name} not found in manifest")
+        for chunk in entry["chunks"]:
+            for record in self._read_object(chunk["digest"]):
+                yield record
+
+    def remove_old(self, keep_count):
+        """
+        Drop all but the newest keep_count backups, legacy copies included,
+        and delete chunks nobody references
+        """
+        removed = self.list_backups()[keep_count:]
+        if not removed:
+            return 0
+
+        removed_names = {backup['filename'] for backup in removed}
+        kept = [entry for entry in self.entries if entry["name"] not in removed_names]
+        referenced = {chunk["digest"] for entry in kept for chunk in entry["chunks"] or ()}
+        orphaned = {chunk["digest"] for entry in self.entries
+                    if entry["name"] in removed_names for chunk in entry["chunks"] or ()} - referenced
+
+        # Kept backups may build on removed ones, so they are written with full chunk lists
+        self.entries = []
+        self._by_name = {}
+        for entry in kept:
+            self._add_entry(entry)
+        self._write_manifest()
+
+        for backup in removed:
+            if backup['chunks'] is None:
+                try:
+                    os.remove(backup['filepath'])
+                except FileNotFoundError:
+                    pass
+        for digest in orphaned:
+            try:
+                os.remove(self._object_path(digest))
+            except FileNotFoundError:
+                pass
+
+        return len(removed)
@@ -1,6 +1,21 @@
 import hashlib
 import json
 
+def canonical_bytes(index, timestamp, data, prev_hash):
+    """
+    Encode a block's contents exactly as they are hashed
+    """
+    # Convert data to JSON string for consistent hashing
+    data_string = json.dumps(data, sort_keys=True) if data else ""
+    block_string = f"{index}{timestamp}{data_string}{prev_hash}"
+    return block_string.encode('utf-8')
+
+def compute_hash(index, timestamp, data, prev_hash):
+    """
+    Create a SHA-256 hash of a block's contents
+    """
+    return hashlib.sha256(canonical_bytes(index, timestamp, data, prev_hash)).hexdigest()
+
 class Block:
     def __init__(self, index, timestamp, data, prev_hash):
         self.index = index
@@ -9,16 +24,24 @@ class Block:
         self.prev_hash = prev_hash
         self.hash = self.hash_block()
 
+    @classmethod
+    def from_stored(cls, index, timestamp, data, prev_hash, hash):
+        """
+        Rebuild a block whose stored hash is already trusted, without re-hashing it
+        """
+        block = cls.__new__(cls)
+        block.index = index
+        block.timestamp = timestamp
+        block.data = data
+        block.prev_hash = prev_hash
+        block.hash = hash
+        return block
+
     def hash_block(self):
         """
         Create a SHA-256 hash of the block contents
         """
-        sha = hashlib.sha256()
-        # Convert data to JSON string for consistent hashing
-        data_string = json.dumps(self.data, sort_keys=True) if self.data else ""
-        block_string = f"{self.index}{self.timestamp}{data_string}{self.prev_hash}"
-        sha.update(block_string.encode('utf-8'))
-        return sha.hexdigest()
+        return compute_hash(self.index, self.timestamp, self.data, self.prev_hash)
 
     def __str__(self):
         """
@@ -49,3 +72,83 @@ class Block:
         Validate the block's hash
         """
         return self.hash == self.hash_block()
+
+    def serialized_size(self):
+        """
+        Size in characters of the block's JSON serialization
+        """
+        return len(json.dumps(self.to_dict(), default=str))
+
+class FrozenDict(dict):
+    """
+    Read-only dictionary that still serializes like a plain dict
+    """
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Frozen block data cannot be modified")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+def freeze(value):
+    """
+    Recursively convert dicts to FrozenDict and lists to tuples
+    """
+    if isinstance(value, dict):
+        return FrozenDict([(key, freeze(item)) for key, item in value.items()])
+    if isinstance(value, (list, tuple)):
+        return tuple([freeze(item) for item in value])
+    return value
+
+class FrozenBlock(Block):
+    """
+    Immutable block. The payload is frozen and its canonical encoding is computed
+    once, then reused by hashing, validation, serialization and size measurement.
+    Hashes are identical to those of a Block with the same contents.
+    """
+    def __init__(self, index, timestamp, data, prev_hash, hash=None):
+        set_attribute = object.__setattr__
+        set_attribute(self, "index", index)
+        set_attribute(self, "timestamp", timestamp)
+        set_attribute(self, "data", freeze(data))
+        set_attribute(self, "prev_hash", prev_hash)
+        set_attribute(self, "_content_hash", None)
+        set_attribute(self, "_dict", None)
+        set_attribute(self, "_size", None)
+        # A stored hash is only checked against the contents when is_valid() is called
+        set_attribute(self, "hash", hash if hash is not None else self.hash_block())
+
+    @classmethod
+    def from_stored(cls, index, timestamp, data, prev_hash, hash):
+        return cls(index, timestamp, data, prev_hash, hash)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrozenBlock is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("FrozenBlock is immutable")
+
+    def hash_block(self):
+        if self._content_hash is None:
+            content_hash = hashlib.sha256(
+                canonical_bytes(self.index, self.timestamp, self.data, self.prev_hash)).hexdigest()
+            object.__setattr__(self, "_content_hash", content_hash)
+        return self._content_hash
+
+    def to_dict(self):
+        if self._dict is None:
+            object.__setattr__(self, "_dict", FrozenDict(Block.to_dict(self)))
+        return self._dict
+
+    def serialized_size(self):
+        if self._size is None:
+            object.__setattr__(self, "_size", Block.serialized_size(self))
+        return self._size
@@ -1,38 +1,308 @@
 # Python module imports
+import os
+import json
+import time
+import hashlib
 import datetime as dt
-from flask import Flask, request, render_template, jsonify
+from contextlib import nullcontext
+from itertools import islice
+from flask import Flask, Response, request, render_template, jsonify
 
 # Importing local functions
 from genesis import create_blockchain
-from newBlock import add_block
-from getBlock import find_records, get_all_attendance_records
-from checkChain import check_integrity, get_blockchain_stats
+from newBlock import add_block, add_blocks
+from getBlock import RecordIndex, StudentIndex, DateIndex, find_records
+from getBlock import iter_attendance_records, search_by_student
+from checkChain import IntegrityWatermark, check_integrity_incremental, get_blockchain_stats
 from persistence import save_blockchain, load_blockchain, export_blockchain_csv
-from analytics import get_attendance_analytics, generate_attendance_report, export_analytics
+from persistence import iter_blockchain_csv, iter_blockchain_ndjson, join_chunks, gzip_chunks
+from persistence import STORAGE_MODE, lock_blockchain_log, blockchain_log_changed, load_blockchain_tail
+from persistence import repair_blockchain_log
+from analytics import AnalyticsState, get_attendance_analytics, generate_attendance_report, export_analytics
+from analytics import iter_analytics_json
+from merkle import MerkleMountainRange
+from chainstore import ChainStore
+from lazychain import LazyChain
+from chainwriter import ChainSnapshot, ChainWriter
+from groupcommit import GroupCommitter
+from blocklog import HAVE_FILE_LOCKS
+from warmup import WarmUp
+from verifier import VerifierPool
 
 # Flask declarations
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'blockendance-secret-key-2018'
-
-# Add cache control headers
+# "list" keeps Block objects in a list, "compact" keeps the chain in a column-based ChainStore
+app.config['CHAIN_STORE'] = os.environ.get('BLOCKENDANCE_CHAIN_STORE', 'list')
+# Page size of /api/records when a cursor is given without a limit, and the largest limit allowed
+app.config['RECORDS_PAGE_SIZE'] = 100
+app.config['RECORDS_MAX_PAGE_SIZE'] = 1000
+# Largest number of records accepted by one /api/blocks/batch request
+app.config['BATCH_MAX_RECORDS'] = 10000
+# "1" lets several worker processes serve one chain stored in the block log: writes
+# hold the log's file lock, and every request first picks up blocks other workers saved
+app.config['SHARED_CHAIN'] = os.environ.get('BLOCKENDANCE_SHARED', '0') == '1'
+
+# Seconds a request made while the chain is still warming up waits for it
+# before it is answered with 503; 0 answers right away
+app.config['WARMUP_WAIT'] = float(os.environ.get('BLOCKENDANCE_WARMUP_WAIT', '10'))
+
+if app.config['SHARED_CHAIN'] and (STORAGE_MODE != 'log' or not HAVE_FILE_LOCKS):
+    raise RuntimeError("BLOCKENDANCE_SHARED=1 needs BLOCKENDANCE_STORAGE=log and fcntl file locks")
+
+# Add cache control headers, unless the route already chose its own
 @app.after_request
 def after_request(response):
-    response.headers.add('Cache-Control', 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0')
+    if 'Cache-Control' not in response.headers:
+        response.headers.add('Cache-Control', 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0')
     return response
 
-# Initializing blockchain with the genesis block
-# Try to load existing blockchain first
-loaded_blockchain, load_message = load_blockchain()
-if loaded_blockchain:
-    blockchain = loaded_blockchain
-    print(f"Loaded existing blockchain: {load_message}")
-else:
+def prepare_chain(chain):
+    """
+    Convert a loaded chain to the configured in-memory representation
+    """
+    if app.config['CHAIN_STORE'] == 'compact' and not isinstance(chain, ChainStore):
+        return ChainStore.from_blocks(chain)
+    return chain
+
+def chain_lock():
+    """
+    Lock held while changing the stored chain, a no-op unless it is shared
+    """
+    return lock_blockchain_log() if app.config['SHARED_CHAIN'] else nullcontext()
+
+def open_chain():
+    """
+    Load the stored chain, or create and save a new one
+    """
+    loaded_blockchain, load_message = load_blockchain()
+    if loaded_blockchain:
+        print(f"Loaded existing blockchain: {load_message}")
+        return prepare_chain(loaded_blockchain)
+
     blockchain = create_blockchain()
     print(f"Created new blockchain: {load_message}")
     # Save the new blockchain
     save_blockchain(blockchain)
+    return prepare_chain(blockchain)
+
+# Height up to which the chain has been verified, so integrity checks only cover new blocks
+integrity_watermark = IntegrityWatermark()
+# Workers for full checks of long chains, kept between checks so only new blocks are sent to them
+verifier_pool = VerifierPool()
+
+# Called with every block appended through add_block
+append_listeners = []
+
+def build_derived(chain):
+    """
+    Build the structures derived from a chain and make them the served ones.
+    They are built before any global is rebound, so readers never see a half-built index.
+    """
+    global merkle_tree, record_index, student_index, date_index, analytics_state
+
+    # Merkle mountain range over the block hashes, for inclusion proofs
+    new_merkle_tree = MerkleMountainRange.from_chain(chain)
+    # Index of attendance records for the /view.html lookup
+    new_record_index = RecordIndex.from_chain(chain)
+    # Roll number to attendance blocks, for /api/students
+    new_student_index = StudentIndex.from_chain(chain)
+    # Attendance blocks sorted by date, for range queries on /api/records
+    new_date_index = DateIndex.from_chain(chain)
+    # Running attendance aggregates for the analytics endpoints
+    new_analytics_state = AnalyticsState.from_chain(chain)
+
+    merkle_tree, record_index, student_index = new_merkle_tree, new_record_index, new_student_index
+    date_index, analytics_state = new_date_index, new_analytics_state
+    append_listeners[:] = [merkle_tree.add_block, record_index.add_block, student_index.add_block,
+                           date_index.add_block, analytics_state.add_block]
+
+# Every change to the chain and its derived structures runs on the writer thread;
+# request handlers read from writer.snapshot() instead of the chain itself.
+# It starts out empty and is given the stored chain once the warm-up has loaded it.
+writer = ChainWriter([])
+
+def commit_chain(snapshot):
+    """
+    Save a chain snapshot for the group committer
+    """
+    if isinstance(snapshot.chain, LazyChain):
+        # Flushing a LazyChain moves its pending blocks, so it has to happen on the writer thread
+        return writer.run(save_blockchain)
+    # Workers sharing the log only append to it while they hold its lock
+    with chain_lock():
+        return save_blockchain(snapshot)
+
+# Saves the chain in the background, once for every batch of appends
+committer = GroupCommitter(commit_chain, writer.snapshot)
+
+def append_attendance(chain, form, form_data):
+    """
+    Writer job: add an attendance block.
+    Returns the new block (None if it wasn't added) and the result message.
+    """
+    result = add_block(form, form_data, chain, append_listeners)
+    if "added" not in result:
+        return None, result
+    return chain[-1], result
+
+def append_batch(chain, records):
+    """
+    Writer job: chain a batch of attendance records in one pass.
+    Returns the per-record results and the hash of the chain's tip afterwards.
+    """
+    results = add_blocks(records, chain, append_listeners)
+    return results, chain[-1].hash
+
+def catch_up(chain):
+    """
+    Writer job: append the blocks saved past the tip of the served chain, e.g. by
+    other workers, reading and verifying only those. Reloads the whole chain if
+    storage no longer continues it.
+    Returns the served chain (None if a reload failed), a message and "tail" or "full".
+    """
+    # Blocks whose group commit is still pending aren't in storage yet, which is no reason to reload
+    blocks, message = load_blockchain_tail(chain, committed_height=committer.committed_height)
+    if blocks is None:
+        loaded_blockchain, load_message = replace_chain(chain, False)
+        return loaded_blockchain, f"{message}; {load_message}", "full"
+    for block in blocks:
+        chain.append(block)
+        for listener in append_listeners:
+            listener(block)
+    if blocks:
+        committer.reset(len(chain))
+    return chain, message, "tail"
+
+def locked_write(chain, job, *args):
+    """
+    Writer job for a shared chain: run job on the latest chain with the log locked,
+    and save the new blocks before another worker can append its own
+    """
+    with chain_lock():
+        catch_up(chain)
+        # catch_up may have reloaded the chain
+        result = job(writer.chain, *args)
+        success, message = save_blockchain(writer.chain)
+        if success:
+            committer.reset(len(writer.chain))
+    return result
+
+def locked_catch_up(chain):
+    """
+    Writer job for a shared chain: catch up with the log while it is locked, first
+    cutting off a record a crashed worker left half-written, which would otherwise
+    keep the log looking changed
+    """
+    with chain_lock():
+        repair_blockchain_log()
+        return catch_up(chain)
+
+def write(job, *args):
+    """
+    Run a writer job that appends blocks
+    """
+    if app.config['SHARED_CHAIN']:
+        return writer.run(locked_write, job, *args)
+    return writer.run(job, *args)
+
+def replace_chain(chain, paranoid):
+    """
+    Writer job: load the chain from storage and serve it instead of the current one
+    """
+    loaded_blockchain, message = load_blockchain(paranoid=paranoid)
+    if loaded_blockchain:
+        loaded_blockchain = prepare_chain(loaded_blockchain)
+        build_derived(loaded_blockchain)
+        integrity_watermark.reset()
+        committer.reset(len(loaded_blockchain))
+        writer.replace(loaded_blockchain)
+    return loaded_blockchain, message
+
+def locked_reload(chain, paranoid, full):
+    """
+    Writer job: reload the chain, with the log locked if it is shared. Only the new
+    tail is read unless paranoid or full is set. Returns what catch_up returns and
+    the seconds it took.
+    """
+    start = time.perf_counter()
+    with chain_lock():
+        if paranoid or full:
+            loaded_blockchain, message = replace_chain(chain, paranoid)
+            path = "full"
+        else:
+            loaded_blockchain, message, path = catch_up(chain)
+    return loaded_blockchain, message, path, time.perf_counter() - start
+
+def install_chain(chain, loaded_blockchain):
+    """
+    Writer job: start serving the chain loaded by the warm-up
+    """
+    committer.reset(len(loaded_blockchain))
+    writer.replace(loaded_blockchain)
+
+def warm_up(progress):
+    """
+    Load, verify and index the chain in the background, then start serving it
+    """
+    progress.begin("loading")
+    # Try to load existing blockchain first; workers sharing it take turns, so only one creates it
+    with chain_lock():
+        blockchain = open_chain()
+    print(f"Blockchain initialized with genesis block: {blockchain[0]}")
+
+    progress.begin("verifying", f"{len(blockchain)} blocks loaded")
+    integrity_result = check_integrity_incremental(blockchain, integrity_watermark, pool=verifier_pool)
+
+    progress.begin("indexing", integrity_result)
+    build_derived(blockchain)
+    writer.run(install_chain, blockchain)
+    return f"Indexed {len(blockchain)} blocks"
+
+# Requests are accepted right away; everything but the health checks waits for the warm-up
+warmup = WarmUp(warm_up).start()
+
+@app.before_request
+def wait_until_ready():
+    if request.endpoint in ('healthz', 'readyz', 'static'):
+        return None
+    if warmup.wait(app.config['WARMUP_WAIT']):
+        return None
+
+    message = "Blockchain is still loading, please try again shortly"
+    if warmup.error:
+        message = f"Blockchain failed to load: {warmup.error}"
+    if request.path.startswith('/api/'):
+        response = jsonify({"error": message, "warmup": warmup.status()})
+    else:
+        response = app.make_response(render_template("index.html", error=message))
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
 
-print(f"Blockchain initialized with genesis block: {blockchain[0]}")
+# Liveness: the process is up and answering, even while it warms up
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok", "warmup": warmup.status()})
+
+# Readiness: 200 once the chain is loaded, verified and indexed, 503 until then
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    status = warmup.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+# Pick up the blocks other workers appended before serving anything;
+# checking for them costs two stat calls. Probes and static files skip it,
+# and so does everything until the warm-up has installed the chain, since
+# a catch-up before then would rebuild the chain alongside warm_up
+@app.before_request
+def refresh_shared_chain():
+    if request.endpoint in ('healthz', 'readyz', 'static'):
+        return None
+    if not warmup.ready.is_set():
+        return None
+    if app.config['SHARED_CHAIN'] and blockchain_log_changed():
+        writer.run(locked_catch_up)
 
 # Default Landing page of the app
 @app.route('/',  methods = ['GET'])
@@ -99,11 +369,11 @@ def parse_request():
                 return render_template("result.html",
                                      result="Error: Missing required information")
 
-            result = add_block(request.form, form_data, blockchain)
+            block, result = write(append_attendance, request.form.to_dict(), form_data)
 
-            # Auto-save blockchain after adding new block
-            if "added" in result:
-                save_success, save_msg = save_blockchain(blockchain)
+            # Report the block as saved only once the commit holding it is on disk
+            if block is not None:
+                save_success, save_msg = committer.request(block.index + 1, block.hash).result()
                 if save_success:
                     result += f" Blockchain automatically saved."
                 else:
@@ -148,7 +418,7 @@ def show_records():
                                  error="Please enter a valid number of students")
 
         # Search for records
-        attendance_data = find_records(request.form, blockchain)
+        attendance_data = find_records(request.form, writer.snapshot(), record_index)
 
         if attendance_data == -1:
             return render_template("view.html",
@@ -178,8 +448,11 @@ def show_records():
 @app.route('/result.html',  methods = ['GET'])
 def check():
     try:
-        integrity_result = check_integrity(blockchain)
-        stats = get_blockchain_stats(blockchain)
+        # full=1 re-verifies the whole chain instead of only the blocks past the watermark
+        full = request.args.get('full', '0') == '1'
+        chain = writer.snapshot()
+        integrity_result = check_integrity_incremental(chain, integrity_watermark, full, verifier_pool)
+        stats = get_blockchain_stats(chain, integrity_watermark)
         return render_template("result.html",
                              result=integrity_result,
                              stats=stats)
@@ -187,21 +460,150 @@ def check():
         return render_template("result.html",
                              result=f"Error checking blockchain: {str(e)}")
 
+# Last rendered body of each cacheable read endpoint, keyed by endpoint
+# and holding the ETag it was rendered for
+response_memo = {}
+
+def chain_etag(chain, *extra):
+    """
+    ETag for a chain: its length and tip hash, plus a digest of any other
+    state the response depends on
+    """
+    tag = f"{len(chain)}-{chain[-1].hash if len(chain) else ''}"
+    if extra:
+        tag += "-" + hashlib.sha256(repr(extra).encode('utf-8')).hexdigest()[:16]
+    return tag
+
+def cached_response(key, etag_parts, capture, render):
+    """
+    Answer If-None-Match with 304 and otherwise reuse the body rendered for
+    this ETag. Once the chain has changed, capture(chain) copies what the
+    response needs from the derived structures on the writer thread, where
+    they aren't being updated meanwhile, and render(snapshot, captured) builds
+    the body on the request thread so appends don't wait for it.
+    """
+    etag = chain_etag(writer.snapshot(), *etag_parts())
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        memo = response_memo.get(key)
+        if memo is None or memo[0] != etag:
+            def capture_job(chain):
+                return ChainSnapshot(chain), chain_etag(chain, *etag_parts()), capture(chain)
+            snapshot, etag, captured = writer.run(capture_job)
+            rendered = render(snapshot, captured)
+            memo = etag, rendered.get_data(), rendered.mimetype
+            response_memo[key] = memo
+        etag = memo[0]
+        response = Response(memo[1], mimetype=memo[2])
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def capture_stats(chain):
+    """
+    Writer job: the stats, from the running aggregates instead of a scan of the chain
+    """
+    stats = get_blockchain_stats(chain, integrity_watermark, analytics_state)
+    if hasattr(chain, "memory_usage"):
+        stats["memory"] = chain.memory_usage()
+    stats["record_index"] = record_index.memory_usage()
+    stats["student_index"] = student_index.memory_usage()
+    stats["date_index"] = date_index.memory_usage()
+    return stats
+
+def capture_analytics(chain):
+    """
+    Writer job: a copy of the attendance aggregates for exactly the blocks in the chain
+    """
+    return analytics_state.copy()
+
 # API endpoint to get blockchain statistics
 @app.route('/api/stats', methods=['GET'])
 def api_stats():
     try:
-        stats = get_blockchain_stats(blockchain)
-        return jsonify(stats)
+        # The stats include the integrity watermark, which moves without new blocks
+        return cached_response('stats', lambda: (integrity_watermark.to_dict(),), capture_stats,
+                               lambda snapshot, stats: jsonify(stats))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# API endpoint to get all attendance records
+def stream_ndjson(records):
+    for record in records:
+        yield app.json.dumps(record) + "\n"
+
+def stream_json(records):
+    yield '{"records":['
+    count = 0
+    for record in records:
+        yield ("," if count else "") + app.json.dumps(record)
+        count += 1
+    yield '],"count":%d}' % count
+
+# API endpoint to get attendance records, optionally filtered by
+# from/to (inclusive YYYY-MM-DD dates), course, teacher and year.
+# cursor/limit page through the records by block index; stream=ndjson or
+# stream=json sends them as they are read instead of building one response.
 @app.route('/api/records', methods=['GET'])
 def api_records():
     try:
-        records = get_all_attendance_records(blockchain)
-        return jsonify({"records": records, "count": len(records)})
+        # Stored dates are YYYY-MM-DD strings compared as text, so other ISO
+        # spellings such as 20240101 are normalized first
+        dates = []
+        for value in (request.args.get('from'), request.args.get('to')):
+            if value is not None:
+                try:
+                    value = dt.date.fromisoformat(value).isoformat()
+                except ValueError:
+                    return jsonify({"error": f"Invalid date: {value}"}), 400
+            dates.append(value)
+        date_from, date_to = dates
+
+        try:
+            cursor = request.args.get('cursor')
+            cursor = int(cursor) if cursor is not None else None
+            limit = request.args.get('limit')
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            return jsonify({"error": "cursor and limit must be integers"}), 400
+        if limit is not None and not 0 < limit <= app.config['RECORDS_MAX_PAGE_SIZE']:
+            return jsonify({"error": f"limit must be between 1 and {app.config['RECORDS_MAX_PAGE_SIZE']}"}), 400
+
+        records = iter_attendance_records(writer.snapshot(), date_index, date_from, date_to,
+                                          course=request.args.get('course'),
+                                          teacher=request.args.get('teacher'),
+                                          year=request.args.get('year'),
+                                          after=cursor)
+
+        stream = request.args.get('stream')
+        if stream == 'ndjson':
+            return Response(stream_ndjson(islice(records, limit)), mimetype='application/x-ndjson')
+        if stream == 'json':
+            return Response(stream_json(islice(records, limit)), mimetype='application/json')
+        if stream is not None:
+            return jsonify({"error": "stream must be ndjson or json"}), 400
+
+        if cursor is None and limit is None:
+            records = list(records)
+            return jsonify({"records": records, "count": len(records)})
+
+        # Read one record past the page to know whether another page follows
+        page_size = limit or app.config['RECORDS_PAGE_SIZE']
+        page = list(islice(records, page_size + 1))
+        next_cursor = page[page_size - 1]["block_index"] if len(page) > page_size else None
+        page = page[:page_size]
+        return jsonify({"records": page, "count": len(page), "next_cursor": next_cursor})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# API endpoint to get the attendance history of one student
+@app.route('/api/students/<roll_no>', methods=['GET'])
+def api_student(roll_no):
+    try:
+        course = request.args.get('course')
+        date = request.args.get('date')
+        records = search_by_student(writer.snapshot(), roll_no, student_index, course, date)
+        return jsonify({"roll_no": roll_no, "records": records, "count": len(records)})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -209,23 +611,55 @@ def api_records():
 @app.route('/api/analytics', methods=['GET'])
 def api_analytics():
     try:
-        analytics = get_attendance_analytics(blockchain)
-        return jsonify(analytics)
+        return cached_response('analytics', tuple, capture_analytics,
+                               lambda snapshot, state: jsonify(get_attendance_analytics(snapshot, state)))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# API endpoint to export data
+def analytics_snapshot(chain):
+    """
+    Writer job: a chain snapshot together with a copy of the attendance aggregates for exactly those blocks
+    """
+    return ChainSnapshot(chain), capture_analytics(chain)
+
+def stream_export(format, compress):
+    """
+    Build a download response that streams an export straight from the chain
+    """
+    blockchain = writer.snapshot()
+    if format == 'csv':
+        chunks, mimetype, filename = iter_blockchain_csv(blockchain), 'text/csv', 'blockchain_export.csv'
+    elif format == 'ndjson':
+        chunks, mimetype, filename = iter_blockchain_ndjson(blockchain), 'application/x-ndjson', 'blockchain_export.ndjson'
+    elif format == 'analytics':
+        blockchain, state = writer.run(analytics_snapshot)
+        chunks = join_chunks(iter_analytics_json(blockchain, state))
+        mimetype, filename = 'application/json', 'blockchain_analytics.json'
+    else:
+        return jsonify({"error": "Download supports csv, ndjson and analytics"}), 400
+
+    if compress:
+        chunks, mimetype, filename = gzip_chunks(chunks), 'application/gzip', filename + '.gz'
+    return Response(chunks, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+# API endpoint to export data. download=1 streams the export in the response
+# instead of writing a file on the server, gzip=1 compresses the stream.
 @app.route('/api/export/<format>', methods=['GET'])
 def api_export(format):
     try:
+        if request.args.get('download', '0') == '1':
+            return stream_export(format, request.args.get('gzip', '0') == '1')
+
         if format == 'csv':
-            success, message = export_blockchain_csv(blockchain)
+            success, message = export_blockchain_csv(writer.snapshot())
             return jsonify({"success": success, "message": message})
         elif format == 'analytics':
-            success, message = export_analytics(blockchain)
+            blockchain, state = writer.run(analytics_snapshot)
+            success, message = export_analytics(blockchain, state=state)
             return jsonify({"success": success, "message": message})
         elif format == 'json':
-            success, message = save_blockchain(blockchain)
+            success, message = committer.flush()
             return jsonify({"success": success, "message": message})
         else:
             return jsonify({"error": "Invalid export format"}), 400
@@ -236,13 +670,84 @@ def api_export(format):
 @app.route('/api/report', methods=['GET'])
 def api_report():
     try:
-        format_type = request.args.get('format', 'json')
-        if format_type == 'text':
-            report = generate_attendance_report(blockchain, format='text')
-            return report, 200, {'Content-Type': 'text/plain'}
-        else:
-            report = generate_attendance_report(blockchain, format='json')
-            return report, 200, {'Content-Type': 'application/json'}
+        format_type = 'text' if request.args.get('format', 'json') == 'text' else 'json'
+        mimetype = 'text/plain' if format_type == 'text' else 'application/json'
+        return cached_response(f'report-{format_type}', tuple, capture_analytics,
+                               lambda snapshot, state: Response(generate_attendance_report(snapshot, format=format_type,
+                                                                                           state=state),
+                                                                mimetype=mimetype))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def parse_batch_body():
+    """
+    Read the records of a batch request from a JSON array or from NDJSON.
+    NDJSON lines that aren't valid JSON are kept as errors so they get their own result.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        records = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                records.append(ValueError(f"Invalid JSON: {e}"))
+        return records
+
+    records = request.get_json(silent=True)
+    if not isinstance(records, list):
+        raise ValueError("Body must be a JSON array of records or NDJSON")
+    return records
+
+# API endpoint to add many attendance records at once. Accepts a JSON array
+# or NDJSON; valid records are chained in order and saved with one commit.
+@app.route('/api/blocks/batch', methods=['POST'])
+def api_blocks_batch():
+    try:
+        try:
+            records = parse_batch_body()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if len(records) > app.config['BATCH_MAX_RECORDS']:
+            return jsonify({"error": f"At most {app.config['BATCH_MAX_RECORDS']} records per batch"}), 413
+
+        # Lines that failed to parse get their error back without reaching the writer
+        parsed = [record for record in records if not isinstance(record, ValueError)]
+        added, tip_hash = write(append_batch, parsed) if parsed else ((), None)
+        added = iter(added)
+        results = [{"error": str(record)} if isinstance(record, ValueError) else next(added)
+                   for record in records]
+
+        indexes = [result["index"] for result in results if "index" in result]
+        response = {
+            "results": results,
+            "added": len(indexes),
+            "failed": len(results) - len(indexes),
+            "saved": False
+        }
+        if indexes:
+            response["saved"], response["message"] = committer.request(indexes[-1] + 1, tip_hash).result()
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# API endpoint to get an inclusion proof for a block
+@app.route('/api/proof/<int:index>', methods=['GET'])
+def api_proof(index):
+    try:
+        def build_proof(chain):
+            if index >= len(merkle_tree):
+                return None
+            proof = merkle_tree.proof(index)
+            proof["block_hash"] = chain[index].hash
+            return proof
+
+        # The tree is updated in place on appends, so the proof is built on the writer thread
+        proof = writer.run(build_proof)
+        if proof is None:
+            return jsonify({"error": f"Block #{index} not found"}), 404
+        return jsonify(proof)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -250,19 +755,22 @@ def api_report():
 @app.route('/api/load', methods=['POST'])
 def api_load():
     try:
-        global blockchain
-        loaded_blockchain, message = load_blockchain()
+        # paranoid=1 re-hashes every block instead of trusting the stored checkpoint,
+        # full=1 reloads the whole chain even if storage still continues it
+        paranoid = request.args.get('paranoid', '0') == '1'
+        full = request.args.get('full', '0') == '1'
+        loaded_blockchain, message, path, elapsed = writer.run(locked_reload, paranoid, full)
+        response = {"message": message, "path": path, "elapsed_ms": round(elapsed * 1000, 3)}
         if loaded_blockchain:
-            blockchain = loaded_blockchain
-            return jsonify({"success": True, "message": message, "blocks": len(blockchain)})
+            return jsonify(dict(response, success=True, blocks=len(loaded_blockchain)))
         else:
-            return jsonify({"success": False, "message": message}), 400
+            return jsonify(dict(response, success=False)), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # Start the flask app when program is executed
 if __name__ == "__main__":
     print("Starting Blockendance - Blockchain-based Attendance System")
-    print(f"Blockchain initialized with {len(blockchain)} blocks")
+    print("Loading the blockchain in the background, see /readyz for progress")
     print("Access the application at: http://localhost:5001")
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,344 @@
+"""
+Blockchain Binary File Module
+Compact binary block format read through mmap, with converters to and from
+the v1.0 JSON format
+"""
+
+import json
+import mmap
+import os
+import struct
+import datetime as dt
+from block import Block
+from checkpoints import build_checkpoint
+
+MAGIC = b"BLKC"
+FORMAT_VERSION = 1
+
+# magic, format version, reserved, metadata length; followed by the metadata JSON
+FILE_HEADER = struct.Struct("<4sHHI")
+
+# record length, index, timestamp (microseconds since the epoch), UTC offset in
+# seconds, flags, prev_hash, hash, extra length, data length; followed by the
+# extra JSON and the data JSON
+RECORD_HEADER = struct.Struct("<IQqiB32s32sHI")
+RECORD_SPAN = struct.Struct("<IQ")
+
+# Sidecar file holding the offset of every record, see lazychain.py
+INDEX_SUFFIX = ".idx"
+
+# JSON chain files have one block per line after this line, so the stored
+# bytes of a prefix of the chain can be digested for the checkpoint
+JSON_BLOCKS_START = b'  "blocks": [\n'
+
+# Flags for fields that cannot be stored in their fixed-layout slot
+# and are kept in the extra JSON instead
+PREV_HASH_TEXT = 0x01
+HASH_TEXT = 0x02
+TIMESTAMP_TEXT = 0x04
+
+NAIVE_OFFSET = -2 ** 31
+EPOCH = dt.datetime(1970, 1, 1)
+ONE_MICROSECOND = dt.timedelta(microseconds=1)
+
+
+def pack_hash(value):
+    """
+    Return the raw 32 bytes of a hex SHA-256 digest, or None if value isn't one
+    """
+    if isinstance(value, str) and len(value) == 64:
+        try:
+            raw = bytes.fromhex(value)
+        except ValueError:
+            return None
+        # Only lowercase hex survives the round trip through bytes.hex()
+        if raw.hex() == value:
+            return raw
+    return None
+
+
+def _pack_timestamp(value):
+    """
+    Return (microseconds, offset) for a timestamp string, or None if it isn't lossless
+    """
+    try:
+        timestamp = dt.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if str(timestamp) != value:
+        return None
+    if timestamp.tzinfo is None:
+        offset = NAIVE_OFFSET
+    else:
+        offset = int(timestamp.utcoffset().total_seconds())
+        timestamp = timestamp.replace(tzinfo=None)
+    return (timestamp - EPOCH) // ONE_MICROSECOND, offset
+
+
+def _unpack_timestamp(micros, offset):
+    timestamp = EPOCH + dt.timedelta(microseconds=micros)
+    if offset != NAIVE_OFFSET:
+        timestamp = timestamp.replace(tzinfo=dt.timezone(dt.timedelta(seconds=offset)))
+    return timestamp
+
+
+def _without_checkpoint(metadata):
+    # A checkpoint digests the stored bytes, so every write computes a fresh one
+    return {key: value for key, value in metadata.items() if key != "checkpoint"}
+
+
+def encode_record(block_data):
+    """
+    Encode a serialized block (as produced by Block.to_dict) into a binary record
+    """
+    flags = 0
+    extra = {}
+
+    prev_hash = pack_hash(block_data["prev_hash"])
+    if prev_hash is None:
+        flags |= PREV_HASH_TEXT
+        extra["prev_hash"] = block_data["prev_hash"]
+        prev_hash = b""
+
+    block_hash = pack_hash(block_data["hash"])
+    if block_hash is None:
+        flags |= HASH_TEXT
+        extra["hash"] = block_data["hash"]
+        block_hash = b""
+
+    packed = _pack_timestamp(block_data["timestamp"])
+    if packed is None:
+        flags |= TIMESTAMP_TEXT
+        extra["timestamp"] = block_data["timestamp"]
+        packed = (0, NAIVE_OFFSET)
+
+    extra_bytes = json.dumps(extra, separators=(',', ':')).encode('utf-8') if extra else b""
+    data_bytes = json.dumps(block_data["data"], separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    length = RECORD_HEADER.size + len(extra_bytes) + len(data_bytes)
+
+    header = RECORD_HEADER.pack(length, block_data["index"], packed[0], packed[1], flags,
+                                prev_hash, block_hash, len(extra_bytes), len(data_bytes))
+    return header + extra_bytes + data_bytes
+
+
+def decode_record(buffer, offset):
+    """
+    Decode the record at offset straight from a buffer.
+    Returns the fields (index, timestamp, data, prev_hash, hash) and the next offset;
+    the timestamp is a datetime unless it was stored as text.
+    """
+    (length, index, micros, tz_offset, flags, prev_hash, block_hash,
+     extra_len, data_len) = RECORD_HEADER.unpack_from(buffer, offset)
+
+    position = offset + RECORD_HEADER.size
+    extra = {}
+    if extra_len:
+        extra = json.loads(bytes(buffer[position:position + extra_len]).decode('utf-8'))
+        position += extra_len
+    data = json.loads(bytes(buffer[position:position + data_len]).decode('utf-8'))
+
+    timestamp = extra["timestamp"] if flags & TIMESTAMP_TEXT else _unpack_timestamp(micros, tz_offset)
+    prev_hash = extra["prev_hash"] if flags & PREV_HASH_TEXT else prev_hash.hex()
+    block_hash = extra["hash"] if flags & HASH_TEXT else block_hash.hex()
+
+    return (index, timestamp, data, prev_hash, block_hash), offset + length
+
+
+def record_span(buffer, offset):
+    """
+    Return the block index stored at offset and the offset of the next record
+    without decoding the payloads
+    """
+    length, index = RECORD_SPAN.unpack_from(buffer, offset)
+    return index, offset + length
+
+
+def fields_to_dict(fields):
+    """
+    Turn decoded record fields into the v1.0 JSON block layout
+    """
+    index, timestamp, data, prev_hash, block_hash = fields
+    return {
+        'index': index,
+        'timestamp': str(timestamp),
+        'data': data,
+        'prev_hash': prev_hash,
+        'hash': block_hash
+    }
+
+
+def fields_to_stored_block(fields):
+    """
+    Build a Block from decoded record fields whose stored hash is already trusted
+    """
+    index, timestamp, data, prev_hash, block_hash = fields
+    if isinstance(timestamp, str):
+        timestamp = dt.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return Block.from_stored(index, timestamp, data, prev_hash, block_hash)
+
+
+def fields_to_block(fields):
+    """
+    Build a Block from decoded record fields and verify the stored hash
+    """
+    index, timestamp, data, prev_hash, block_hash = fields
+    if isinstance(timestamp, str):
+        timestamp = dt.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    block = Block(index, timestamp, data, prev_hash)
+    if block.hash != block_hash:
+        raise ValueError(f"Hash mismatch in block {index}")
+    return block
+
+
+def write_block_file(filename, metadata, block_records):
+    """
+    Write metadata and serialized blocks to a binary block file, replacing it atomically.
+    A checkpoint over the encoded records is added to the metadata.
+    """
+    encoded_records = [encode_record(block_data) for block_data in block_records]
+    metadata = _without_checkpoint(metadata)
+    checkpoint = build_checkpoint(encoded_records, block_records)
+    if checkpoint:
+        metadata["checkpoint"] = checkpoint
+
+    metadata_bytes = json.dumps(metadata, separators=(',', ':'), default=str).encode('utf-8')
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, 'wb') as f:
+        f.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(metadata_bytes)))
+        f.write(metadata_bytes)
+        for record in encoded_records:
+            f.write(record)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_filename, filename)
+
+    # Any offset index built for the previous contents is now stale
+    try:
+        os.remove(filename + INDEX_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def write_json_file(filename, metadata, block_records):
+    """
+    Write a v1.0 JSON chain file with every block on a line of its own, replacing
+    it atomically. A checkpoint over the stored lines is added to the metadata.
+    """
+    block_lines = ["    " + json.dumps(block_data, default=str) for block_data in block_records]
+    metadata = _without_checkpoint(metadata)
+    # Each line but the first is stored after its separator
+    checkpoint = build_checkpoint([(b",\n" if position else b"") + line.encode('utf-8')
+                                   for position, line in enumerate(block_lines)], block_records)
+    if checkpoint:
+        metadata["checkpoint"] = checkpoint
+
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, 'w', encoding='utf-8') as f:
+        f.write('{\n  "metadata": ')
+        f.write(json.dumps(metadata, indent=2, default=str).replace('\n', '\n  '))
+        f.write(',\n' + JSON_BLOCKS_START.decode('utf-8'))
+        f.write(',\n'.join(block_lines))
+        f.write('\n  ]\n}\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_filename, filename)
+
+
+def is_block_file(filename):
+    """
+    Check whether a file starts with the binary block file magic
+    """
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class BlockFile:
+    """
+    Read-only view of a binary block file mapped into memory
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        try:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{filename} is empty")
+
+        magic, version, _, metadata_len = FILE_HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{filename} is not a binary block file")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported block file version {version}")
+
+        start = FILE_HEADER.size
+        self.metadata = json.loads(bytes(self.buffer[start:start + metadata_len]).decode('utf-8'))
+        self.first_offset = start + metadata_len
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.buffer.close()
+        self._file.close()
+
+    def iter_fields(self, offset=None):
+        """
+        Yield decoded record fields in file order
+        """
+        if offset is None:
+            offset = self.first_offset
+        end = len(self.buffer)
+        while offset < end:
+            fields, offset = decode_record(self.buffer, offset)
+            yield fields
+
+    def iter_blocks(self):
+        """
+        Yield verified Block objects in file order
+        """
+        for fields in self.iter_fields():
+            yield fields_to_block(fields)
+
+
+def json_to_binary(json_filename, binary_filename):
+    """
+    Convert a v1.0 JSON blockchain file to the binary block format
+    """
+    with open(json_filename, 'r') as f:
+        blockchain_data = json.load(f)
+    write_block_file(binary_filename, blockchain_data.get("metadata", {}), blockchain_data["blocks"])
+    return len(blockchain_data["blocks"])
+
+
+def binary_to_json(binary_filename, json_filename):
+    """
+    Convert a binary block file back to the v1.0 JSON format
+    """
+    with BlockFile(binary_filename) as block_file:
+        metadata = block_file.metadata
+        block_records = [fields_to_dict(fields) for fields in block_file.iter_fields()]
+    write_json_file(json_filename, metadata, block_records)
+    return len(block_records)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert between JSON and binary blockchain files")
+    parser.add_argument("direction", choices=["to-binary", "to-json"])
+    parser.add_argument("source")
+    parser.add_argument("destination")
+    args = parser.parse_args()
+
+    if args.direction == "to-binary":
+        count = json_to_binary(args.source, args.destination)
+    else:
+        count = binary_to_json(args.source, args.destination)
+    print(f"Converted {count} blocks from {args.source} to {args.destination}")
@@ -0,0 +1,307 @@
+"""
+Blockchain Log Module
+Append-only segmented storage for blocks, so that saving a new block costs
+the same no matter how long the chain already is
+"""
+
+import bisect
+import json
+import os
+import struct
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+HAVE_FILE_LOCKS = fcntl is not None
+
+SEGMENT_SIZE = 4 * 1024 * 1024
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".log"
+LOCK_NAME = "LOCK"
+
+# Every record is a payload length and a CRC32 of the payload, followed by
+# the block serialized as compact JSON
+RECORD_HEADER = struct.Struct(">II")
+
+
+def encode_record(record):
+    """
+    Encode a block dictionary as a framed log record
+    """
+    payload = json.dumps(record, separators=(',', ':'), default=str).encode('utf-8')
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_record(f):
+    """
+    Read the next record from an open segment file.
+    Returns None at the end of the segment or when the record is torn or corrupt.
+    """
+    header = f.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        return None
+    length, checksum = RECORD_HEADER.unpack(header)
+    payload = f.read(length)
+    if len(payload) < length or zlib.crc32(payload) != checksum:
+        return None
+    try:
+        return json.loads(payload.decode('utf-8'))
+    except ValueError:
+        return None
+
+
+class LogLock:
+    """
+    Exclusive lock on a log directory, shared by every process that appends
+    to the log. Each acquisition opens the lock file anew, so two LogLocks
+    exclude each other even within one process. Without fcntl it does nothing.
+    """
+
+    def __init__(self, log_dir):
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = os.path.join(log_dir, LOCK_NAME)
+        self._file = None
+
+    def acquire(self, blocking=True):
+        f = open(self.path, 'ab')
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                return False
+        self._file = f
+        return True
+
+    def release(self):
+        # Closing the file drops the lock
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class BlockLog:
+    """
+    Segmented append-only log of block records.
+    Segments are named after the number of the first record they contain and
+    a new segment is started once the active one reaches segment_size bytes.
+    One BlockLog may be shared by several threads: appends, refreshes and
+    resets take lock, which callers also hold across a check of the log and
+    the append that depends on it.
+    """
+
+    def __init__(self, log_dir, segment_size=SEGMENT_SIZE):
+        self.log_dir = log_dir
+        self.segment_size = segment_size
+        self.lock = threading.RLock()
+        os.makedirs(log_dir, exist_ok=True)
+        self._dir_mtime = os.stat(log_dir).st_mtime_ns
+        self.segments = self._list_segments()
+        self.record_count = 0
+        self.last_record = None
+        self.active_size = 0
+        self.recovered_bytes = 0
+        self._recover()
+
+    def _segment_path(self, base):
+        return os.path.join(self.log_dir, f"{SEGMENT_PREFIX}{base:020d}{SEGMENT_SUFFIX}")
+
+    def _list_segments(self):
+        bases = []
+        for filename in os.listdir(self.log_dir):
+            if filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_SUFFIX):
+                bases.append(int(filename[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(bases)
+
+    def _scan(self, base):
+        """
+        Read a segment up to its last complete record.
+        Returns the number of complete records, the last of them and where it ends.
+        """
+        count, last_record, valid_size = 0, None, 0
+        with open(self._segment_path(base), 'rb') as f:
+            while True:
+                record = read_record(f)
+                if record is None:
+                    break
+                count += 1
+                last_record = record
+                valid_size = f.tell()
+        return count, last_record, valid_size
+
+    def _recover(self):
+        """
+        Find the end of the last complete record. Bytes after it are left alone:
+        they may be a record another process is still writing, so a torn record
+        left by a crash is only cut off by truncate_torn_tail(), under the log's lock.
+        """
+        if not self.segments:
+            return
+        base = self.segments[-1]
+        count, self.last_record, self.active_size = self._scan(base)
+        self.record_count = base + count
+        if count == 0 and len(self.segments) > 1:
+            # Only a torn record made it into this segment; the previous one ends with the last block
+            self.last_record = self._scan(self.segments[-2])[1]
+
+    def truncate_torn_tail(self):
+        """
+        Cut off the bytes after the last complete record of the active segment,
+        left behind by a writer that died partway through an append. Only call
+        this right after refresh() and while holding the log's LogLock, or a
+        record another process is still writing would be cut off.
+        Returns the number of bytes removed.
+        """
+        with self.lock:
+            if not self.segments:
+                return 0
+            path = self._segment_path(self.segments[-1])
+            torn = os.path.getsize(path) - self.active_size
+            if torn <= 0:
+                return 0
+            with open(path, 'r+b') as f:
+                f.truncate(self.active_size)
+                f.flush()
+                os.fsync(f.fileno())
+            self.recovered_bytes += torn
+            return torn
+
+    def changed(self):
+        """
+        Cheap check for records appended by another process since the last refresh
+        """
+        with self.lock:
+            try:
+                # A new segment changes the directory, new records grow the active segment
+                if os.stat(self.log_dir).st_mtime_ns != self._dir_mtime:
+                    return True
+                if self.segments:
+                    return os.path.getsize(self._segment_path(self.segments[-1])) != self.active_size
+                return False
+            except OSError:
+                return True
+
+    def refresh(self):
+        """
+        Read the records other processes appended since this log was opened or last
+        refreshed. Only complete records are taken, so a record that is still being
+        written is picked up by a later refresh. Returns the number of new records.
+        """
+        with self.lock:
+            return self._refresh()
+
+    def _refresh(self):
+        self._dir_mtime = os.stat(self.log_dir).st_mtime_ns
+        active = self.segments[-1] if self.segments else None
+        added = 0
+        for base in self._list_segments():
+            if active is not None and base < active:
+                continue
+            if base != active:
+                # The next segment starts right after the last record of the active one
+                if base != self.record_count:
+                    break
+                self.segments.append(base)
+                self.active_size = 0
+                active = base
+
+            with open(self._segment_path(base), 'rb') as f:
+                f.seek(self.active_size)
+                while True:
+                    record = read_record(f)
+                    if record is None:
+                        break
+                    self.record_count += 1
+                    self.last_record = record
+                    self.active_size = f.tell()
+                    added += 1
+        return added
+
+    @property
+    def last_hash(self):
+        return self.last_record.get("hash") if self.last_record else None
+
+    def append_records(self, records):
+        """
+        Append block records to the log and make them durable with a single fsync
+        """
+        if not records:
+            return 0
+        with self.lock:
+            return self._append_records(records)
+
+    def _append_records(self, records):
+        if not self.segments:
+            self.segments.append(self.record_count)
+        f = open(self._segment_path(self.segments[-1]), 'ab')
+        try:
+            for record in records:
+                data = encode_record(record)
+                if self.active_size > 0 and self.active_size + len(data) > self.segment_size:
+                    # Roll over to a new segment starting at the next record number
+                    f.flush()
+                    os.fsync(f.fileno())
+                    f.close()
+                    self.segments.append(self.record_count)
+                    self.active_size = 0
+                    f = open(self._segment_path(self.record_count), 'ab')
+                f.write(data)
+                self.active_size += len(data)
+                self.record_count += 1
+                self.last_record = record
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+
+        return len(records)
+
+    def iter_records(self, start=0):
+        """
+        Yield block records in order, starting from record number start
+        """
+        # Records appended meanwhile lie past record_count, so they don't disturb the read
+        with self.lock:
+            segments, record_count = list(self.segments), self.record_count
+        if not segments or start >= record_count:
+            return
+        position = max(bisect.bisect_right(segments, start) - 1, 0)
+        for base in segments[position:]:
+            number = base
+            with open(self._segment_path(base), 'rb') as f:
+                while number < record_count:
+                    if number < start:
+                        # Records before start were checked when the log was opened; skip the payload
+                        header = f.read(RECORD_HEADER.size)
+                        if len(header) < RECORD_HEADER.size:
+                            break
+                        f.seek(RECORD_HEADER.unpack(header)[0], os.SEEK_CUR)
+                        number += 1
+                        continue
+                    record = read_record(f)
+                    if record is None:
+                        break
+                    yield record
+                    number += 1
+
+    def reset(self):
+        """
+        Remove every segment so the log can be rewritten from scratch
+        """
+        with self.lock:
+            for base in self.segments:
+                os.remove(self._segment_path(base))
+            self.segments = []
+            self.record_count = 0
+            self.last_record = None
+            self.active_size = 0
@@ -0,0 +1,230 @@
+"""
+Blockchain Store Module
+Compact struct-of-arrays storage for the chain, with dictionary-encoded
+teachers, courses, years, dates and student roll numbers
+"""
+
+import sys
+import datetime as dt
+from array import array
+from block import Block
+from blockfile import EPOCH, ONE_MICROSECOND, pack_hash
+
+ATTENDANCE_KEYS = ("type", "teacher_name", "date", "course", "year", "present_students")
+
+# Values of the kind column
+OTHER = 0
+ATTENDANCE = 1
+
+
+class StringTable:
+    """
+    Interns strings and hands out small integer ids for them
+    """
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+        # Kept up to date on encode, so memory_usage() doesn't walk the values
+        self.value_bytes = 0
+
+    def encode(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(sys.intern(value))
+            self.ids[value] = value_id
+            self.value_bytes += sys.getsizeof(value)
+        return value_id
+
+    def decode(self, value_id):
+        return self.values[value_id]
+
+    def __len__(self):
+        return len(self.values)
+
+    def memory_usage(self):
+        return sys.getsizeof(self.values) + sys.getsizeof(self.ids) + self.value_bytes
+
+
+def _is_compact_attendance(data):
+    """
+    Check that a payload has exactly the layout add_block creates, so it can be
+    rebuilt from the columns without changing its serialization
+    """
+    if not isinstance(data, dict) or tuple(data) != ATTENDANCE_KEYS or data["type"] != "attendance":
+        return False
+    if not all(isinstance(data[key], str) for key in ATTENDANCE_KEYS[1:5]):
+        return False
+    students = data["present_students"]
+    return isinstance(students, (list, tuple)) and all(isinstance(student, str) for student in students)
+
+
+class StoredBlock(Block):
+    """
+    Read-only view of one block in a ChainStore
+    """
+    __slots__ = ("_store", "_position", "_data")
+
+    def __init__(self, store, position):
+        self._store = store
+        self._position = position
+        self._data = None
+
+    @property
+    def index(self):
+        return self._store._index[self._position]
+
+    @property
+    def timestamp(self):
+        return self._store._get_timestamp(self._position)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._store._get_data(self._position)
+        return self._data
+
+    @property
+    def prev_hash(self):
+        return self._store._get_hash(self._store._prev_hashes, self._store._odd_prev_hashes, self._position)
+
+    @property
+    def hash(self):
+        return self._store._get_hash(self._store._hashes, self._store._odd_hashes, self._position)
+
+
+class ChainStore:
+    """
+    Holds every block field in a typed column instead of one object per block.
+    Supports len(), indexing, slicing, iteration and append like the block list;
+    items are StoredBlock views that behave like read-only blocks.
+    """
+
+    def __init__(self):
+        self._index = array('q')
+        self._timestamps = array('q')
+        self._hashes = bytearray()
+        self._prev_hashes = bytearray()
+        self._kind = bytearray()
+
+        # Attendance payload columns
+        self._teachers = array('I')
+        self._dates = array('I')
+        self._courses = array('I')
+        self._years = array('I')
+        self._student_offsets = array('Q', [0])
+        self._students = array('I')
+
+        self.teacher_table = StringTable()
+        self.date_table = StringTable()
+        self.course_table = StringTable()
+        self.year_table = StringTable()
+        self.student_table = StringTable()
+
+        # Values that don't fit their column, keyed by position
+        self._odd_timestamps = {}
+        self._odd_hashes = {}
+        self._odd_prev_hashes = {}
+        self._other_data = {}
+
+    @classmethod
+    def from_blocks(cls, blocks):
+        store = cls()
+        for block in blocks:
+            store.append(block)
+        return store
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [StoredBlock(self, position) for position in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError("blockchain index out of range")
+        return StoredBlock(self, key)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield StoredBlock(self, position)
+
+    def append(self, block):
+        position = len(self)
+        self._index.append(block.index)
+
+        timestamp = block.timestamp
+        if isinstance(timestamp, dt.datetime) and timestamp.tzinfo is None:
+            self._timestamps.append((timestamp - EPOCH) // ONE_MICROSECOND)
+        else:
+            self._timestamps.append(0)
+            self._odd_timestamps[position] = timestamp
+
+        self._append_hash(self._hashes, self._odd_hashes, position, block.hash)
+        self._append_hash(self._prev_hashes, self._odd_prev_hashes, position, block.prev_hash)
+
+        data = block.data
+        if _is_compact_attendance(data):
+            self._kind.append(ATTENDANCE)
+            self._teachers.append(self.teacher_table.encode(data["teacher_name"]))
+            self._dates.append(self.date_table.encode(data["date"]))
+            self._courses.append(self.course_table.encode(data["course"]))
+            self._years.append(self.year_table.encode(data["year"]))
+            self._students.extend(self.student_table.encode(student) for student in data["present_students"])
+        else:
+            self._kind.append(OTHER)
+            self._teachers.append(0)
+            self._dates.append(0)
+            self._courses.append(0)
+            self._years.append(0)
+            self._other_data[position] = data
+        self._student_offsets.append(len(self._students))
+
+    def _append_hash(self, column, odd_values, position, value):
+        raw = pack_hash(value)
+        if raw is None:
+            raw = bytes(32)
+            odd_values[position] = value
+        column += raw
+
+    def _get_hash(self, column, odd_values, position):
+        if position in odd_values:
+            return odd_values[position]
+        return column[position * 32:(position + 1) * 32].hex()
+
+    def _get_timestamp(self, position):
+        if position in self._odd_timestamps:
+            return self._odd_timestamps[position]
+        return EPOCH + dt.timedelta(microseconds=self._timestamps[position])
+
+    def _get_data(self, position):
+        if self._kind[position] != ATTENDANCE:
+            return self._other_data[position]
+        start, end = self._student_offsets[position], self._student_offsets[position + 1]
+        decode_student = self.student_table.decode
+        return {
+            "type": "attendance",
+            "teacher_name": self.teacher_table.decode(self._teachers[position]),
+            "date": self.date_table.decode(self._dates[position]),
+            "course": self.course_table.decode(self._courses[position]),
+            "year": self.year_table.decode(self._years[position]),
+            "present_students": [decode_student(student) for student in self._students[start:end]]
+        }
+
+    def memory_usage(self):
+        """
+        Approximate bytes used by the columns and string tables
+        """
+        columns = [self._index, self._timestamps, self._teachers, self._dates, self._courses,
+                   self._years, self._student_offsets, self._students]
+        tables = [self.teacher_table, self.date_table, self.course_table, self.year_table,
+                  self.student_table]
+        return {
+            "columns_bytes": (sum(column.itemsize * len(column) for column in columns) +
+                              len(self._hashes) + len(self._prev_hashes) + len(self._kind)),
+            "string_tables_bytes": sum(table.memory_usage() for table in tables),
+            "unencoded_blocks": len(self._other_data),
+            "unique_students": len(self.student_table)
+        }
@@ -0,0 +1,104 @@
+"""
+Blockchain Writer Module
+Single writer thread that applies every change to the chain in order, and
+snapshots that let readers use the chain without taking a lock
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class ChainSnapshot:
+    """
+    The blocks a chain held when the snapshot was taken. The chain is only
+    ever appended to, so later appends and replacements never show through.
+    """
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.length = len(chain)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step == 1:
+                return self.chain[start:stop]
+            return [self.chain[i] for i in range(start, stop, step)]
+        if key < 0:
+            key += self.length
+        if key < 0 or key >= self.length:
+            raise IndexError("blockchain index out of range")
+        return self.chain[key]
+
+    def __iter__(self):
+        for i in range(self.length):
+            yield self.chain[i]
+
+
+class ChainWriter:
+    """
+    Owns the chain and runs every job that changes it on one thread, in the
+    order the jobs were submitted. Jobs are called with the current chain;
+    a job may install a different chain with replace().
+    """
+
+    def __init__(self, chain):
+        self.chain = chain
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="chain-writer", daemon=True)
+        self._thread.start()
+
+    def snapshot(self):
+        return ChainSnapshot(self.chain)
+
+    def replace(self, chain):
+        """
+        Install a new chain; only call this from a job
+        """
+        self.chain = chain
+
+    def submit(self, job, *args):
+        """
+        Queue job(chain, *args) and return a Future for its result
+        """
+        future = Future()
+        if threading.current_thread() is self._thread:
+            # Already on the writer thread, queueing would deadlock
+            self._call(future, job, args)
+        else:
+            self._jobs.put((future, job, args))
+        return future
+
+    def run(self, job, *args, timeout=None):
+        """
+        Run job(chain, *args) on the writer thread and wait for its result
+        """
+        return self.submit(job, *args).result(timeout)
+
+    def close(self):
+        """
+        Finish the queued jobs and stop the writer thread
+        """
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _call(self, future, job, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = job(self.chain, *args)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def _run(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            self._call(*item)
@@ -1,20 +1,54 @@
-def check_integrity(chain):
+import datetime as dt
+from verifier import should_verify_in_parallel, find_first_failure
+
+# How often the incremental check falls back to re-verifying the whole chain
+FULL_CHECK_INTERVAL = dt.timedelta(hours=24)
+
+class IntegrityWatermark:
     """
-    Check the integrity of the entire blockchain
+    Height up to which the chain has been verified and the hash of the block at that height
     """
-    if not chain:
-        return "Error: Empty blockchain"
+    def __init__(self):
+        self.reset()
 
-    if len(chain) == 1:
-        # Only genesis block
-        genesis = chain[0]
-        if genesis.is_valid() and genesis.index == 0:
-            return "Blockchain integrity verified: Only genesis block present"
-        else:
-            return "Error: Invalid genesis block"
+    def reset(self):
+        self.height = 0
+        self.tip_hash = None
+        self.checked_at = None
+        self.full_checked_at = None
 
-    # Check each block
-    for i, block in enumerate(chain):
+    def is_consistent(self, chain):
+        """
+        Check that the verified prefix is still part of the chain
+        """
+        if self.height == 0 or self.height > len(chain):
+            return False
+        return chain[self.height - 1].hash == self.tip_hash
+
+    def full_check_due(self):
+        return self.full_checked_at is None or dt.datetime.now() - self.full_checked_at >= FULL_CHECK_INTERVAL
+
+    def advance(self, chain, full=False):
+        self.height = len(chain)
+        self.tip_hash = chain[-1].hash if chain else None
+        self.checked_at = dt.datetime.now()
+        if full:
+            self.full_checked_at = self.checked_at
+
+    def to_dict(self):
+        return {
+            "verified_height": self.height,
+            "verified_hash": self.tip_hash,
+            "last_checked": str(self.checked_at) if self.checked_at else None,
+            "last_full_check": str(self.full_checked_at) if self.full_checked_at else None
+        }
+
+def _check_blocks(chain, start, stop):
+    """
+    Check hashes, links and indexes of the blocks in positions start to stop
+    """
+    for i in range(start, stop):
+        block = chain[i]
         # Validate current block's hash
         if not block.is_valid():
             return f"Error: Block #{i} has invalid hash"
@@ -29,8 +63,62 @@ def check_integrity(chain):
             if block.index != previous_block.index + 1:
                 return f"Error: Block #{i} has incorrect index. Expected {previous_block.index + 1}, got {block.index}"
 
+    return None
+
+def check_integrity(chain, workers=None, pool=None):
+    """
+    Check the integrity of the entire blockchain; long chains are verified in
+    pool (a VerifierPool) when one is given
+    """
+    if not chain:
+        return "Error: Empty blockchain"
+
+    if len(chain) == 1:
+        # Only genesis block
+        genesis = chain[0]
+        if genesis.is_valid() and genesis.index == 0:
+            return "Blockchain integrity verified: Only genesis block present"
+        else:
+            return "Error: Invalid genesis block"
+
+    # Long chains are hashed in chunks across a process pool
+    if should_verify_in_parallel(chain, pool.workers if pool else workers):
+        failure = find_first_failure(chain, workers, pool=pool)
+        if failure:
+            return failure
+        return f"Blockchain integrity verified: All {len(chain)} blocks are valid and properly linked"
+
+    # Check each block
+    failure = _check_blocks(chain, 0, len(chain))
+    if failure:
+        return failure
+
     return f"Blockchain integrity verified: All {len(chain)} blocks are valid and properly linked"
 
+def check_integrity_incremental(chain, watermark, full=False, pool=None):
+    """
+    Check only the blocks appended since the watermark, after confirming the
+    block at the watermark still has the hash that was verified. The whole
+    chain is re-verified when full is set, the prefix changed or a scheduled
+    full check is due.
+    """
+    if full or not watermark.is_consistent(chain) or watermark.full_check_due():
+        result = check_integrity(chain, pool=pool)
+        if result.startswith("Blockchain integrity verified"):
+            watermark.advance(chain, full=True)
+        else:
+            watermark.reset()
+        return result
+
+    start = watermark.height
+    failure = _check_blocks(chain, start, len(chain))
+    if failure:
+        return failure
+
+    watermark.advance(chain)
+    return (f"Blockchain integrity verified: All {len(chain)} blocks are valid and properly linked "
+            f"({len(chain) - start} new since last check)")
+
 def validate_block(block, previous_block=None):
     """
     Validate a single block
@@ -51,9 +139,10 @@ def validate_block(block, previous_block=None):
 
     return True, "Block is valid"
 
-def get_blockchain_stats(chain):
+def get_blockchain_stats(chain, watermark=None, state=None):
     """
-    Get statistics about the blockchain
+    Get statistics about the blockchain. The attendance totals are taken from
+    state, the AnalyticsState kept alongside the chain, instead of a scan when given.
     """
     if not chain:
         return {"error": "Empty blockchain"}
@@ -66,11 +155,18 @@ def get_blockchain_stats(chain):
         "total_attendance_records": 0
     }
 
-    for block in chain:
-        if (block.index > 0 and
-            isinstance(block.data, dict) and
-            block.data.get("type") == "attendance"):
-            stats["attendance_blocks"] += 1
-            stats["total_attendance_records"] += len(block.data.get("present_students", []))
+    if state is not None:
+        stats["attendance_blocks"] = state.attendance_blocks
+        stats["total_attendance_records"] = state.total_students_recorded
+    else:
+        for block in chain:
+            if (block.index > 0 and
+                isinstance(block.data, dict) and
+                block.data.get("type") == "attendance"):
+                stats["attendance_blocks"] += 1
+                stats["total_attendance_records"] += len(block.data.get("present_students", []))
+
+    if watermark is not None:
+        stats["integrity_watermark"] = watermark.to_dict()
 
     return stats
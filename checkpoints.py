@@ -0,0 +1,54 @@
+"""
+Blockchain Checkpoints Module
+Digest over the stored bytes of the verified prefix of the chain, so a load
+only has to re-hash the blocks added after the last checkpoint
+"""
+
+import hashlib
+
+CHECKPOINT_INTERVAL = 1000
+
+
+def build_checkpoint(encoded_records, block_records, interval=None):
+    """
+    Checkpoint the blocks up to the last complete interval. encoded_records are
+    the blocks exactly as they are written to the file, one bytes object each,
+    and are stored back to back from the start of the block section.
+    """
+    if interval is None:
+        interval = CHECKPOINT_INTERVAL
+    height = len(block_records) - len(block_records) % interval
+    if height == 0:
+        return None
+
+    digest = hashlib.sha256()
+    length = 0
+    for payload in encoded_records[:height]:
+        digest.update(payload)
+        length += len(payload)
+    return {
+        "height": height,
+        "length": length,
+        "digest": digest.hexdigest(),
+        "tip_hash": block_records[height - 1]["hash"],
+        "interval": interval
+    }
+
+
+def verify_prefix(checkpoint, buffer, start):
+    """
+    Check the stored bytes of the blocks covered by a checkpoint, which begin at
+    offset start of buffer, against its digest.
+    Returns the number of blocks that can be trusted without re-hashing them.
+    """
+    if not checkpoint:
+        return 0
+    try:
+        end = start + checkpoint["length"]
+        if end > len(buffer):
+            return 0
+        if hashlib.sha256(buffer[start:end]).hexdigest() != checkpoint["digest"]:
+            return 0
+        return checkpoint["height"]
+    except (KeyError, TypeError, ValueError):
+        return 0
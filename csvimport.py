@@ -0,0 +1,256 @@
+"""
+Blockchain CSV Import Module
+Streams a CSV file back into a chain: rows exported by export_blockchain_csv
+are verified against their hashes, rows without hashes (e.g. from a roster
+system) are appended as new blocks
+"""
+
+import csv
+import datetime as dt
+import os
+from block import Block, compute_hash
+from blocklog import BlockLog, LogLock
+from genesis import create_genesis_block, genesis_data
+from newBlock import next_block, validate_attendance_record
+
+# Rows between two progress reports
+PROGRESS_INTERVAL = 10000
+
+
+class CSVImportError(ValueError):
+    """
+    Raised when a row can't be verified or appended; the message names the row
+    """
+
+
+def _parse_timestamp(value):
+    return dt.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _row_students(row):
+    students = row.get('students_present')
+    if students is None:
+        students = row.get('present_students') or ''
+    return students.split(';') if students else []
+
+
+def _row_data(row, line):
+    """
+    Validated block data for a row without a hash, in add_block's layout
+    """
+    if (row.get('type') or 'attendance').strip() != 'attendance':
+        raise CSVImportError(f"Row {line}: unsupported block type {row['type']}")
+
+    record = {field: row.get(field) or '' for field in ("teacher_name", "date", "course", "year")}
+    record["present_students"] = [student.strip() for student in _row_students(row) if student.strip()]
+    attendance_data, error = validate_attendance_record(record)
+    if error:
+        raise CSVImportError(f"Row {line}: {error}")
+    return attendance_data
+
+
+def _stored_data(row, line):
+    """
+    Block data of a hashed row exactly as it was stored, so the hash can be checked
+    """
+    if row.get('type') == 'genesis':
+        return genesis_data()
+    if row.get('type') != 'attendance':
+        raise CSVImportError(f"Row {line}: unsupported block type {row.get('type')}")
+    return {
+        "type": "attendance",
+        "teacher_name": row.get('teacher_name') or '',
+        "date": row.get('date') or '',
+        "course": row.get('course') or '',
+        "year": row.get('year') or '',
+        "present_students": _row_students(row)
+    }
+
+
+def _verified_block(row, line):
+    """
+    Rebuild the block a hashed row was exported from and check its hash
+    """
+    try:
+        index = int(row['block_index'])
+        timestamp = _parse_timestamp(row['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        raise CSVImportError(f"Row {line}: invalid block_index or timestamp")
+
+    data = _stored_data(row, line)
+    prev_hash = row.get('prev_hash') or ''
+    if compute_hash(index, timestamp, data, prev_hash) != row['hash']:
+        raise CSVImportError(f"Row {line}: block #{index} has invalid hash")
+    return Block.from_stored(index, timestamp, data, prev_hash, row['hash'])
+
+
+def iter_csv_blocks(rows, tip=None):
+    """
+    Yield the new blocks for an iterable of CSV rows (dicts), in order.
+
+    tip is the last block already in the target chain. Hashed rows must link
+    up with each other and with the chain; rows up to the tip are checked and
+    skipped, so re-importing an export of the same chain adds nothing.
+    Rows without a hash are chained onto the tip as new blocks.
+    Raises CSVImportError at the first row that doesn't fit.
+    """
+    previous = None
+    for line, row in enumerate(rows, start=2):
+        if row.get('hash'):
+            block = _verified_block(row, line)
+            if previous is not None:
+                if block.prev_hash != previous.hash:
+                    raise CSVImportError(f"Row {line}: block #{block.index} is not linked to block #{previous.index}")
+                if block.index != previous.index + 1:
+                    raise CSVImportError(f"Row {line}: expected block #{previous.index + 1}, got #{block.index}")
+            elif tip is None and (block.index != 0 or block.prev_hash != "0"):
+                raise CSVImportError(f"Row {line}: an empty chain must start with a genesis block")
+            previous = block
+
+            if tip is not None and block.index <= tip.index:
+                # Already in the chain; the row at the tip must be the tip itself
+                if block.index == tip.index and block.hash != tip.hash:
+                    raise CSVImportError(f"Row {line}: block #{block.index} does not match the chain")
+                continue
+            if tip is not None and (block.index != tip.index + 1 or block.prev_hash != tip.hash):
+                raise CSVImportError(f"Row {line}: block #{block.index} does not continue the chain at block #{tip.index}")
+        else:
+            if row.get('type') == 'genesis':
+                raise CSVImportError(f"Row {line}: genesis rows must carry their hash")
+            if tip is None:
+                tip = create_genesis_block()
+                yield tip
+            block = next_block(tip, _row_data(row, line), frozen=True)
+            previous = None
+
+        tip = block
+        yield block
+
+
+def _read_rows(filename, progress=None):
+    """
+    Yield CSV rows from a file, reporting (rows, bytes read, total bytes) as it goes
+    """
+    total = os.path.getsize(filename)
+    position = 0
+
+    with open(filename, 'rb') as f:
+        def lines():
+            nonlocal position
+            for raw in f:
+                position += len(raw)
+                yield raw.decode('utf-8')
+
+        count = 0
+        for row in csv.DictReader(lines()):
+            yield row
+            count += 1
+            if progress and count % PROGRESS_INTERVAL == 0:
+                progress(count, position, total)
+        if progress and (count % PROGRESS_INTERVAL or not count):
+            progress(count, position, total)
+
+
+def import_blockchain_csv(filename, blockchain, on_append=None, progress=None):
+    """
+    Import a CSV file into an in-memory chain.
+    Returns (success, message); blocks imported before a failing row stay in the chain.
+    """
+    appended = 0
+    try:
+        tip = blockchain[-1] if blockchain else None
+        for block in iter_csv_blocks(_read_rows(filename, progress), tip):
+            blockchain.append(block)
+            for callback in on_append or ():
+                callback(block)
+            appended += 1
+        return True, f"Imported {appended} new blocks from {filename}"
+    except (CSVImportError, OSError, UnicodeDecodeError, csv.Error) as e:
+        return False, f"Error importing {filename} after {appended} new blocks: {str(e)}"
+
+
+def import_csv_to_log(filename, log_dir, batch_size=1000, progress=None):
+    """
+    Import a CSV file straight into a block log, holding at most batch_size
+    blocks in memory. Returns (success, message).
+    """
+    # Servers sharing the log append under the same lock
+    with LogLock(log_dir):
+        return _import_csv_to_log(filename, log_dir, batch_size, progress)
+
+
+def _import_csv_to_log(filename, log_dir, batch_size, progress):
+    block_log = BlockLog(log_dir)
+    # The log lock is held, so bytes after the last complete record are a crashed writer's
+    block_log.truncate_torn_tail()
+    tip = None
+    if block_log.last_record:
+        record = block_log.last_record
+        tip = Block.from_stored(record["index"], _parse_timestamp(record["timestamp"]),
+                                record["data"], record["prev_hash"], record["hash"])
+
+    appended, batch = 0, []
+    try:
+        for block in iter_csv_blocks(_read_rows(filename, progress), tip):
+            batch.append(block.to_dict())
+            if len(batch) >= batch_size:
+                appended += block_log.append_records(batch)
+                batch = []
+        appended += block_log.append_records(batch)
+        return True, f"Imported {appended} new blocks from {filename} into {log_dir}"
+    except (CSVImportError, OSError, UnicodeDecodeError, csv.Error) as e:
+        # Keep the verified blocks read before the failure
+        appended += block_log.append_records(batch)
+        return False, f"Error importing {filename} after {appended} new blocks: {str(e)}"
+
+
+def import_csv_to_storage(filename, batch_size=1000, progress=None):
+    """
+    Import a CSV file into the chain of the configured storage mode
+    (BLOCKENDANCE_STORAGE). The block log is streamed into; JSON and binary
+    files are loaded, extended and saved. Returns (success, message).
+    """
+    from persistence import LOG_DIR, STORAGE_MODE, load_blockchain, save_blockchain
+
+    if STORAGE_MODE == "log":
+        return import_csv_to_log(filename, LOG_DIR, batch_size, progress)
+
+    blockchain, message = load_blockchain(lazy=False)
+    if blockchain is None:
+        if "not found" not in message:
+            return False, f"Error importing {filename}: {message}"
+        blockchain = []
+
+    stored = len(blockchain)
+    success, message = import_blockchain_csv(filename, blockchain, progress=progress)
+    if len(blockchain) == stored:
+        return success, message
+
+    # Like the log import, keep the blocks read before a failing row
+    saved, save_message = save_blockchain(blockchain)
+    if not saved:
+        return False, f"{message}; {save_message}"
+    return success, message
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Import a blockchain CSV export or attendance roster")
+    parser.add_argument("source")
+    parser.add_argument("--log-dir", help="block log to append to instead of the chain of BLOCKENDANCE_STORAGE")
+    parser.add_argument("--batch-size", type=int, default=1000, help="blocks written per fsync")
+    args = parser.parse_args()
+
+    def report(rows, position, total):
+        percent = 100.0 * position / total if total else 100.0
+        print(f"\r{rows} rows read ({percent:.1f}%)", end="", file=sys.stderr, flush=True)
+
+    if args.log_dir:
+        success, message = import_csv_to_log(args.source, args.log_dir, args.batch_size, report)
+    else:
+        success, message = import_csv_to_storage(args.source, args.batch_size, report)
+    print(file=sys.stderr)
+    print(message)
+    sys.exit(0 if success else 1)
@@ -1,16 +1,21 @@
 import datetime as dt
 from block import Block
 
-def create_genesis_block():
+def genesis_data():
     """
-    Create the genesis block (first block in the blockchain)
+    Data stored in every genesis block
     """
-    genesis_data = {
+    return {
         "type": "genesis",
         "message": "Genesis Block - Blockchain Initialized",
         "creator": "Blockendance System"
     }
-    return Block(0, dt.datetime.now(), genesis_data, "0")
+
+def create_genesis_block():
+    """
+    Create the genesis block (first block in the blockchain)
+    """
+    return Block(0, dt.datetime.now(), genesis_data(), "0")
 
 def create_blockchain():
     """
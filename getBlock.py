@@ -1,6 +1,210 @@
-def find_records(form, blockchain):
+import sys
+from bisect import bisect_left, bisect_right, insort
+
+
+def _is_attendance_block(block):
+    return (block.index != 0 and
+            isinstance(block.data, dict) and
+            block.data.get("type") == "attendance")
+
+
+class RecordIndex:
+    """
+    Hash index from (teacher, date, course, year, student count) to the position
+    of the first matching attendance block, so find_records doesn't scan the chain
     """
-    Find attendance records in the blockchain based on form criteria
+
+    def __init__(self):
+        self.positions = {}
+        self.size = 0
+        # Bytes of the keys, kept up to date so memory_usage() doesn't walk them
+        self.key_bytes = 0
+
+    @classmethod
+    def from_chain(cls, chain):
+        index = cls()
+        index.rebuild(chain)
+        return index
+
+    def rebuild(self, chain):
+        """
+        Replace the index with one built over the given chain
+        """
+        self.positions = {}
+        self.size = 0
+        self.key_bytes = 0
+        for block in chain:
+            self.add_block(block)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add_block(self, block):
+        position = self.size
+        self.size += 1
+        if not _is_attendance_block(block):
+            return
+
+        block_data = block.data
+        key = (block_data.get("teacher_name", ""),
+               block_data.get("date", ""),
+               block_data.get("course", ""),
+               block_data.get("year", ""),
+               len(block_data.get("present_students", [])))
+        try:
+            # Keep the earliest block, the one a scan would find first
+            if key not in self.positions:
+                self.positions[key] = position
+                self.key_bytes += sys.getsizeof(key)
+        except TypeError:
+            # Unhashable field values can never equal the string criteria
+            pass
+
+    def lookup(self, teacher_name, date, course, year, student_count):
+        return self.positions.get((teacher_name, date, course, year, student_count))
+
+    def memory_usage(self):
+        """
+        Approximate bytes used by the index; the strings are shared with the blocks
+        """
+        return {
+            "entries": len(self.positions),
+            "bytes": sys.getsizeof(self.positions) + self.key_bytes
+        }
+
+
+class StudentIndex:
+    """
+    Inverted index from roll number to the positions of the attendance blocks
+    the student is marked present in, in chain order
+    """
+
+    def __init__(self):
+        self.positions = {}
+        self.size = 0
+        # Bytes of the position lists, kept up to date so memory_usage() doesn't walk them
+        self.list_bytes = 0
+
+    @classmethod
+    def from_chain(cls, chain):
+        index = cls()
+        index.rebuild(chain)
+        return index
+
+    def rebuild(self, chain):
+        """
+        Replace the index with one built over the given chain
+        """
+        self.positions = {}
+        self.size = 0
+        self.list_bytes = 0
+        for block in chain:
+            self.add_block(block)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add_block(self, block):
+        position = self.size
+        self.size += 1
+        if not _is_attendance_block(block):
+            return
+
+        for roll_no in block.data.get("present_students", []):
+            try:
+                positions = self.positions.setdefault(roll_no, [])
+            except TypeError:
+                continue
+            # A student listed twice in one block is recorded once
+            if not positions or positions[-1] != position:
+                size = sys.getsizeof(positions) if positions else 0
+                positions.append(position)
+                self.list_bytes += sys.getsizeof(positions) - size
+
+    def lookup(self, roll_no):
+        return self.positions.get(roll_no, [])
+
+    def memory_usage(self):
+        """
+        Approximate bytes used by the index; the roll numbers are shared with the blocks
+        """
+        return {
+            "students": len(self.positions),
+            "bytes": sys.getsizeof(self.positions) + self.list_bytes
+        }
+
+
+class DateIndex:
+    """
+    (date, position) pairs of the attendance blocks kept sorted by date, so a
+    date range is found with two binary searches
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.size = 0
+        # Bytes of the entries, kept up to date so memory_usage() doesn't walk them
+        self.entry_bytes = 0
+
+    @classmethod
+    def from_chain(cls, chain):
+        index = cls()
+        index.rebuild(chain)
+        return index
+
+    def rebuild(self, chain):
+        """
+        Replace the index with one built over the given chain
+        """
+        self.entries = []
+        self.size = 0
+        self.entry_bytes = 0
+        for block in chain:
+            self.add_block(block)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add_block(self, block):
+        position = self.size
+        self.size += 1
+        if not _is_attendance_block(block):
+            return
+
+        date = block.data.get("date", "")
+        if not isinstance(date, str):
+            return
+        entry = (date, position)
+        self.entry_bytes += sys.getsizeof(entry)
+        # Blocks mostly arrive in date order, so this is usually a plain append
+        if not self.entries or self.entries[-1] <= entry:
+            self.entries.append(entry)
+        else:
+            insort(self.entries, entry)
+
+    def positions_between(self, date_from=None, date_to=None):
+        """
+        Positions of the blocks dated from date_from to date_to inclusive, in chain order
+        """
+        start = bisect_left(self.entries, (date_from,)) if date_from is not None else 0
+        # Any (date_to, position) sorts before (date_to + "\0",)
+        stop = bisect_right(self.entries, (date_to + "\0",)) if date_to is not None else len(self.entries)
+        return sorted(position for _, position in self.entries[start:stop])
+
+    def memory_usage(self):
+        """
+        Approximate bytes used by the index; the dates are shared with the blocks
+        """
+        return {
+            "entries": len(self.entries),
+            "bytes": sys.getsizeof(self.entries) + self.entry_bytes
+        }
+
+
+def find_records(form, blockchain, record_index=None):
+    """
+    Find attendance records in the blockchain based on form criteria.
+    Uses record_index when given instead of scanning the chain.
     """
     try:
         # Extract search criteria from form
@@ -10,15 +214,10 @@ def find_records(form, blockchain):
         search_year = form.get("year", "").strip()
         expected_count = int(form.get("number", 0))
 
-        # Search through blockchain
-        for block in blockchain:
-            # Skip genesis block
-            if block.index == 0:
-                continue
-
-            # Check if block contains attendance data
-            if not isinstance(block.data, dict) or block.data.get("type") != "attendance":
-                continue
+        def matches(block):
+            # Skip genesis block and blocks without attendance data
+            if not _is_attendance_block(block):
+                return False
 
             # Extract block data
             block_data = block.data
@@ -31,9 +230,22 @@ def find_records(form, blockchain):
                 block_data.get("year", "") == search_year,
                 len(block_data.get("present_students", [])) == expected_count
             ]
+            return all(conditions)
+
+        if record_index is not None:
+            position = record_index.lookup(search_name, search_date, search_course,
+                                           search_year, expected_count)
+            # The index can be ahead of a chain snapshot taken before the last append
+            if position is None or position >= len(blockchain):
+                return -1
+            # It may also belong to a chain that replaced the snapshot; then scan it
+            if matches(blockchain[position]):
+                return blockchain[position].data.get("present_students", [])
 
-            if all(conditions):
-                return block_data.get("present_students", [])
+        # Search through blockchain
+        for block in blockchain:
+            if matches(block):
+                return block.data.get("present_students", [])
 
         return -1  # Not found
 
@@ -41,42 +253,85 @@ def find_records(form, blockchain):
         print(f"Error in find_records: {e}")
         return -1
 
-def get_all_attendance_records(blockchain):
+def _attendance_record(block):
+    return {
+        "block_index": block.index,
+        "timestamp": block.timestamp,
+        "teacher_name": block.data.get("teacher_name", ""),
+        "date": block.data.get("date", ""),
+        "course": block.data.get("course", ""),
+        "year": block.data.get("year", ""),
+        "present_students": block.data.get("present_students", []),
+        "student_count": len(block.data.get("present_students", []))
+    }
+
+def _in_date_range(date, date_from, date_to):
+    if not isinstance(date, str):
+        return False
+    return (date_from is None or date >= date_from) and (date_to is None or date <= date_to)
+
+def iter_attendance_records(blockchain, date_index=None, date_from=None, date_to=None,
+                            course=None, teacher=None, year=None, after=None):
     """
-    Get all attendance records from the blockchain
+    Yield attendance records in chain order, optionally limited to a date range,
+    to one course, teacher and year, and to blocks after position `after`.
+    With a date_index a date range only reads the blocks inside it.
     """
-    records = []
-    for block in blockchain:
-        if (block.index > 0 and
-            isinstance(block.data, dict) and
-            block.data.get("type") == "attendance"):
-            records.append({
-                "block_index": block.index,
-                "timestamp": block.timestamp,
-                "teacher_name": block.data.get("teacher_name", ""),
-                "date": block.data.get("date", ""),
-                "course": block.data.get("course", ""),
-                "year": block.data.get("year", ""),
-                "present_students": block.data.get("present_students", []),
-                "student_count": len(block.data.get("present_students", []))
-            })
-    return records
-
-def search_by_student(blockchain, roll_no):
+    start = 0 if after is None else max(after + 1, 0)
+    has_range = date_from is not None or date_to is not None
+    if date_index is not None and has_range:
+        positions = date_index.positions_between(date_from, date_to)
+        positions = positions[bisect_left(positions, start):bisect_left(positions, len(blockchain))]
+        blocks = (blockchain[position] for position in positions)
+    else:
+        blocks = (blockchain[position] for position in range(start, len(blockchain)))
+
+    # Index reads race the writer, whose insort can shift the searched window
+    # or whose chain replacement can renumber blocks, so the range is re-checked
+    blocks = (block for block in blocks
+              if _is_attendance_block(block) and
+              (not has_range or _in_date_range(block.data.get("date", ""), date_from, date_to)))
+
+    return (_attendance_record(block) for block in blocks
+            if (course is None or block.data.get("course", "") == course) and
+            (teacher is None or block.data.get("teacher_name", "") == teacher) and
+            (year is None or block.data.get("year", "") == year))
+
+def get_all_attendance_records(blockchain, date_index=None, date_from=None, date_to=None,
+                               course=None, teacher=None, year=None):
     """
-    Find all attendance records for a specific student
+    Get all attendance records from the blockchain, optionally filtered like
+    iter_attendance_records
+    """
+    return list(iter_attendance_records(blockchain, date_index, date_from, date_to,
+                                        course, teacher, year))
+
+def search_by_student(blockchain, roll_no, student_index=None, course=None, date=None):
     """
+    Find all attendance records for a specific student, optionally limited to
+    one course and date. Uses student_index when given instead of scanning the chain.
+    """
+    if student_index is not None:
+        # The index can be ahead of a chain snapshot taken before the last append
+        blocks = (blockchain[position] for position in student_index.lookup(roll_no)
+                  if position < len(blockchain))
+    else:
+        blocks = blockchain
+    # An index swapped in by a chain replacement can point at other blocks of
+    # the snapshot, so every match is re-checked
+    blocks = (block for block in blocks
+              if _is_attendance_block(block) and roll_no in block.data.get("present_students", []))
+
     student_records = []
-    for block in blockchain:
-        if (block.index > 0 and
-            isinstance(block.data, dict) and
-            block.data.get("type") == "attendance"):
-
-            if roll_no in block.data.get("present_students", []):
-                student_records.append({
-                    "date": block.data.get("date", ""),
-                    "course": block.data.get("course", ""),
-                    "year": block.data.get("year", ""),
-                    "teacher_name": block.data.get("teacher_name", "")
-                })
+    for block in blocks:
+        if course is not None and block.data.get("course", "") != course:
+            continue
+        if date is not None and block.data.get("date", "") != date:
+            continue
+        student_records.append({
+            "date": block.data.get("date", ""),
+            "course": block.data.get("course", ""),
+            "year": block.data.get("year", ""),
+            "teacher_name": block.data.get("teacher_name", "")
+        })
     return student_records
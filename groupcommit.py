@@ -0,0 +1,190 @@
+"""
+Blockchain Group Commit Module
+Background persister that saves the chain once for a whole batch of appends,
+so concurrent submissions share one durable write instead of queueing behind
+a save each
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# How long the first append in a batch waits for others to join it, and the
+# batch size that triggers a commit without waiting out the window. Appends
+# made while a commit is being written always join the next one, so batching
+# happens under load even with no window.
+COMMIT_WINDOW = float(os.environ.get("BLOCKENDANCE_COMMIT_WINDOW", "0"))
+COMMIT_MAX_BLOCKS = int(os.environ.get("BLOCKENDANCE_COMMIT_MAX_BLOCKS", "64"))
+
+
+def _holds(chain, height, tip_hash):
+    """
+    Check that the block at position height - 1 of chain is the one with tip_hash
+    """
+    return len(chain) >= height and chain[height - 1].hash == tip_hash
+
+
+class GroupCommitter:
+    """
+    Collects commit requests and saves the chain for all of them at once.
+    save(chain) returns (success, message) like save_blockchain; snapshot()
+    returns the chain to save. A request fails if the chain saved for it no
+    longer holds the block it names, e.g. because the chain was replaced.
+    """
+
+    def __init__(self, save, snapshot, window=None, max_blocks=None, committed_height=0):
+        self._save = save
+        self._snapshot = snapshot
+        self.window = COMMIT_WINDOW if window is None else window
+        self.max_blocks = COMMIT_MAX_BLOCKS if max_blocks is None else max_blocks
+
+        # Number of blocks known to be on disk
+        self.committed_height = committed_height
+        self.commits = 0
+
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._batch_started = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def request(self, height, tip_hash):
+        """
+        Ask for the first height blocks to be made durable; tip_hash is the hash
+        of the last of them. Returns a Future that resolves to (success, message)
+        once they are, or once the chain turns out not to hold that block anymore.
+        """
+        future = Future()
+        with self._condition:
+            if height <= self.committed_height and _holds(self._snapshot(), height, tip_hash):
+                future.set_result((True, f"Blockchain already saved ({self.committed_height} blocks)"))
+                return future
+            if self._closed:
+                raise RuntimeError("Group committer is closed")
+            if not self._waiting:
+                self._batch_started = time.monotonic()
+            self._waiting.append((height, tip_hash, future))
+            self._condition.notify()
+        return future
+
+    def flush(self, timeout=None):
+        """
+        Commit everything appended so far and wait for it
+        """
+        chain = self._snapshot()
+        if not chain:
+            return True, "Blockchain already saved (0 blocks)"
+        return self.request(len(chain), chain[-1].hash).result(timeout)
+
+    def reset(self, height):
+        """
+        Record that the chain on disk now holds height blocks, e.g. after it was reloaded
+        """
+        with self._condition:
+            self.committed_height = height
+
+    def close(self):
+        """
+        Commit the requests already made and stop the thread
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._waiting and not self._closed:
+                self._condition.wait()
+
+            # Give concurrent appends the rest of the window to join this commit
+            deadline = self._batch_started + self.window if self._waiting else 0
+            while len(self._waiting) < self.max_blocks and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch, self._waiting = self._waiting, []
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+
+            # Taken after the batch is cut, so it holds every block the batch asked for
+            chain = self._snapshot()
+            try:
+                success, message = self._save(chain)
+            except Exception as e:
+                success, message = False, f"Error saving blockchain: {str(e)}"
+
+            with self._condition:
+                if success:
+                    self.committed_height = max(self.committed_height, len(chain))
+                self.commits += 1
+            for height, tip_hash, future in batch:
+                if success and not _holds(chain, height, tip_hash):
+                    future.set_result((False, f"Block #{height - 1} was replaced before it was saved"))
+                else:
+                    future.set_result((success, message))
+
+
+if __name__ == "__main__":
+    # Compare appends that each save the chain with appends sharing group commits
+    import tempfile
+    import persistence
+    from chainwriter import ChainWriter
+    from genesis import create_blockchain
+    from newBlock import add_block
+
+    THREADS = 16
+    APPENDS_PER_THREAD = 10
+
+    def append(chain, teacher):
+        add_block({"roll_no1": "S-01", "roll_no2": "S-02"}, [teacher, "2024-01-01", "Course", "2024"], chain)
+        return len(chain), chain[-1].hash
+
+    def append_and_save(chain, teacher):
+        tip = append(chain, teacher)
+        persistence.save_blockchain(chain)
+        return tip
+
+    def run(mode, label, group_commit):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            persistence.STORAGE_MODE = mode
+            writer = ChainWriter(create_blockchain())
+            committer = GroupCommitter(persistence.save_blockchain, writer.snapshot)
+
+            def submit(teacher):
+                for _ in range(APPENDS_PER_THREAD):
+                    if group_commit:
+                        committer.request(*writer.run(append, teacher)).result()
+                    else:
+                        writer.run(append_and_save, teacher)
+
+            threads = [threading.Thread(target=submit, args=(f"Teacher {t}",)) for t in range(THREADS)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            committer.close()
+            writer.close()
+            commits = committer.commits if group_commit else THREADS * APPENDS_PER_THREAD
+            print(f"{mode:>4} {label:<16} {THREADS * APPENDS_PER_THREAD / elapsed:8.1f} appends/s, {commits} saves")
+
+    original_dir = os.getcwd()
+    try:
+        for mode in ("json", "log"):
+            run(mode, "save per append", False)
+            run(mode, "group commit", True)
+    finally:
+        os.chdir(original_dir)
@@ -0,0 +1,181 @@
+"""
+Lazy Blockchain Module
+List-like chain over a binary block file that keeps only an offset index in
+memory and decodes blocks when they are accessed
+"""
+
+import os
+import threading
+import weakref
+from array import array
+from collections import OrderedDict
+from blockfile import INDEX_SUFFIX, BlockFile, encode_record, fields_to_block, decode_record, record_span
+
+DEFAULT_CACHE_SIZE = 1024
+
+# Open chains, whose locks a forked verifier worker must not inherit while another thread holds them
+_open_chains = weakref.WeakSet()
+
+
+def _reset_locks():
+    for chain in _open_chains:
+        chain._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_locks)
+
+
+class LazyChain:
+    """
+    Supports len(), indexing, slicing, iteration and append like the list of
+    blocks used everywhere else. Decoded blocks are kept in a bounded LRU cache
+    and appended blocks stay in memory until flush() writes them to the file.
+    Readers on other threads may index the chain while one thread appends and flushes.
+    """
+
+    def __init__(self, filename, cache_size=DEFAULT_CACHE_SIZE):
+        self.filename = filename
+        self.index_filename = filename + INDEX_SUFFIX
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._pending = []
+        # Guards the cache and the switch of pending blocks to stored ones in flush()
+        self._lock = threading.Lock()
+        self._block_file = BlockFile(filename)
+        self._offsets = self._load_index()
+        _open_chains.add(self)
+
+    def _load_index(self):
+        """
+        Read the sidecar offset index and extend it with records appended since it was written
+        """
+        buffer = self._block_file.buffer
+        offsets = array('Q')
+        if os.path.exists(self.index_filename):
+            with open(self.index_filename, 'rb') as f:
+                data = f.read()
+            # Ignore a torn trailing entry
+            offsets.frombytes(data[:len(data) - len(data) % offsets.itemsize])
+
+        # Discard an index that doesn't line up with the file, e.g. after a full rewrite
+        if offsets and (offsets[0] != self._block_file.first_offset or
+                        offsets[-1] >= len(buffer) or
+                        record_span(buffer, offsets[-1])[0] != len(offsets) - 1):
+            offsets = array('Q')
+
+        if offsets:
+            end = record_span(buffer, offsets[-1])[1]
+        else:
+            end = self._block_file.first_offset
+            open(self.index_filename, 'wb').close()
+
+        new_offsets = array('Q')
+        while end < len(buffer):
+            new_offsets.append(end)
+            end = record_span(buffer, end)[1]
+
+        if new_offsets:
+            with open(self.index_filename, 'ab') as f:
+                new_offsets.tofile(f)
+            offsets.extend(new_offsets)
+        return offsets
+
+    def __len__(self):
+        with self._lock:
+            return len(self._offsets) + len(self._pending)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+
+        with self._lock:
+            length = len(self._offsets) + len(self._pending)
+            if key < 0:
+                key += length
+            if key < 0 or key >= length:
+                raise IndexError("blockchain index out of range")
+
+            stored = len(self._offsets)
+            if key >= stored:
+                return self._pending[key - stored]
+
+            block = self._cache.get(key)
+            if block is not None:
+                self._cache.move_to_end(key)
+                return block
+            # The mapping stays open for as long as this reference holds it, even if
+            # flush() maps the grown file meanwhile
+            block_file, offset = self._block_file, self._offsets[key]
+
+        fields, _ = decode_record(block_file.buffer, offset)
+        block = fields_to_block(fields)
+        with self._lock:
+            self._cache[key] = block
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return block
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def append(self, block):
+        with self._lock:
+            self._pending.append(block)
+
+    @property
+    def metadata(self):
+        return self._block_file.metadata
+
+    def flush(self):
+        """
+        Append pending blocks to the block file and its offset index
+        """
+        with self._lock:
+            pending = list(self._pending)
+        if not pending:
+            return 0
+
+        end = len(self._block_file.buffer)
+        new_offsets = array('Q')
+        with open(self.filename, 'ab') as f:
+            for block in pending:
+                record = encode_record(block.to_dict())
+                new_offsets.append(end)
+                f.write(record)
+                end += len(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(self.index_filename, 'ab') as f:
+            new_offsets.tofile(f)
+
+        # Map the grown file and keep the freshly written blocks decoded. The old
+        # mapping isn't closed: readers may still be decoding from it, and it is
+        # released once the last of them drops it.
+        block_file = BlockFile(self.filename)
+        with self._lock:
+            self._block_file = block_file
+            start = len(self._offsets)
+            self._offsets.extend(new_offsets)
+            for position, block in enumerate(pending, start):
+                self._cache[position] = block
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self._pending = self._pending[len(pending):]
+        return len(pending)
+
+    def memory_usage(self):
+        """
+        Report the size of the offset index and how many blocks are held in memory
+        """
+        with self._lock:
+            return {
+                "offset_index_bytes": self._offsets.itemsize * len(self._offsets),
+                "cached_blocks": len(self._cache),
+                "pending_blocks": len(self._pending)
+            }
+
+    def close(self):
+        self._block_file.close()
@@ -0,0 +1,179 @@
+"""
+Blockchain Merkle Module
+Merkle mountain range over block hashes for inclusion proofs and for locating
+tampered blocks with a logarithmic number of hash comparisons
+"""
+
+import hashlib
+
+# Domain separation so a leaf can never be mistaken for an inner node
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def hash_leaf(block_hash):
+    return hashlib.sha256(LEAF_PREFIX + block_hash.encode('utf-8')).digest()
+
+
+def hash_node(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def bag_peaks(peaks):
+    """
+    Fold the peaks right to left into a single root
+    """
+    if not peaks:
+        return None
+    root = peaks[-1]
+    for peak in reversed(peaks[:-1]):
+        root = hash_node(peak, root)
+    return root
+
+
+class MerkleMountainRange:
+    """
+    Append-only Merkle structure kept as one list of node hashes per level.
+    levels[0] holds the leaves; a parent is added as soon as both children exist,
+    so appending a block costs O(log n) hashes.
+    """
+
+    def __init__(self):
+        self.levels = [[]]
+
+    @classmethod
+    def from_chain(cls, chain):
+        tree = cls()
+        tree.rebuild(chain)
+        return tree
+
+    def rebuild(self, chain):
+        """
+        Replace the tree with one built over the given chain
+        """
+        self.levels = [[]]
+        for block in chain:
+            self.append(block.hash)
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    def append(self, block_hash):
+        self._append_leaf(hash_leaf(block_hash))
+
+    def _append_leaf(self, leaf):
+        level = 0
+        self.levels[0].append(leaf)
+        while len(self.levels[level]) % 2 == 0:
+            left, right = self.levels[level][-2:]
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            self.levels[level + 1].append(hash_node(left, right))
+            level += 1
+
+    def add_block(self, block):
+        self.append(block.hash)
+
+    def _has_parent(self, level, position):
+        return level + 1 < len(self.levels) and position // 2 < len(self.levels[level + 1])
+
+    def peak_positions(self):
+        """
+        (level, position) of each peak, left to right
+        """
+        return [(level, len(nodes) - 1)
+                for level, nodes in reversed(list(enumerate(self.levels)))
+                if len(nodes) % 2 == 1]
+
+    def peaks(self):
+        return [self.levels[level][position] for level, position in self.peak_positions()]
+
+    def root(self):
+        root = bag_peaks(self.peaks())
+        return root.hex() if root else None
+
+    def proof(self, index):
+        """
+        Build an inclusion proof for the block at index
+        """
+        if index < 0 or index >= len(self):
+            raise IndexError("block index out of range")
+
+        path = []
+        level, position = 0, index
+        while self._has_parent(level, position):
+            sibling = position ^ 1
+            path.append({
+                "side": "left" if sibling < position else "right",
+                "hash": self.levels[level][sibling].hex()
+            })
+            level, position = level + 1, position // 2
+
+        return {
+            "index": index,
+            "leaf": self.levels[0][index].hex(),
+            "path": path,
+            "peak_index": self.peak_positions().index((level, position)),
+            "peaks": [peak.hex() for peak in self.peaks()],
+            "root": self.root(),
+            "size": len(self)
+        }
+
+
+def verify_proof(block_hash, proof):
+    """
+    Check that a block hash is included under the root of an inclusion proof
+    """
+    try:
+        node = hash_leaf(block_hash)
+        for step in proof["path"]:
+            sibling = bytes.fromhex(step["hash"])
+            node = hash_node(sibling, node) if step["side"] == "left" else hash_node(node, sibling)
+
+        peaks = [bytes.fromhex(peak) for peak in proof["peaks"]]
+        if peaks[proof["peak_index"]] != node:
+            return False
+        return bag_peaks(peaks).hex() == proof["root"]
+    except (KeyError, IndexError, TypeError, ValueError):
+        return False
+
+
+def find_first_mismatch(trusted, other):
+    """
+    Find the first leaf where two trees of the same size differ by comparing
+    peaks and then descending into the left-most differing subtree.
+    Returns None when the trees are identical.
+    """
+    if len(trusted) != len(other):
+        raise ValueError("Trees must cover the same number of blocks")
+
+    for level, position in trusted.peak_positions():
+        if trusted.levels[level][position] == other.levels[level][position]:
+            continue
+        while level > 0:
+            level, position = level - 1, position * 2
+            if trusted.levels[level][position] == other.levels[level][position]:
+                position += 1
+        return position
+    return None
+
+
+def locate_tampering(chain, trusted):
+    """
+    Find the first block whose contents no longer match the hash recorded in
+    the trusted tree, or None when every covered block is intact
+    """
+    covered = min(len(chain), len(trusted))
+    current = MerkleMountainRange()
+    for block in chain[:covered]:
+        current.append(block.hash_block())
+
+    if covered < len(trusted):
+        # Blocks were removed from the end of the chain, compare the part that is left
+        prefix = MerkleMountainRange()
+        for leaf in trusted.levels[0][:covered]:
+            prefix._append_leaf(leaf)
+        mismatch = find_first_mismatch(prefix, current)
+        return covered if mismatch is None else mismatch
+
+    return find_first_mismatch(trusted, current)
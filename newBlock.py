@@ -1,24 +1,91 @@
-from block import Block
+from block import Block, FrozenBlock
 import datetime as dt
 import copy
 
-def next_block(last_block, data):
+def next_block(last_block, data, frozen=False):
     """
-    Create the next block in the blockchain
+    Create the next block in the blockchain.
+    With frozen set the block is a FrozenBlock, whose frozen payload already
+    protects it from later changes to data without a deep copy.
     """
     if not last_block:
         raise ValueError("Previous block cannot be None")
 
     this_index = last_block.index + 1
     this_timestamp = dt.datetime.now()
+    this_prev_hash = last_block.hash
+    if frozen:
+        return FrozenBlock(this_index, this_timestamp, data, this_prev_hash)
+
     # Deep copy to prevent modification of original data
     this_data = copy.deepcopy(data)
-    this_prev_hash = last_block.hash
     return Block(this_index, this_timestamp, this_data, this_prev_hash)
 
-def add_block(form, data, blockchain):
+ATTENDANCE_FIELDS = ("teacher_name", "date", "course", "year")
+
+def validate_attendance_record(record):
+    """
+    Check one attendance record for bulk ingestion and build its block data.
+    Returns (attendance_data, None) or (None, error message).
+    """
+    if not isinstance(record, dict):
+        return None, "Record must be a JSON object"
+
+    for field in ATTENDANCE_FIELDS:
+        value = record.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return None, f"Missing or empty field: {field}"
+    # Only YYYY-MM-DD, since fromisoformat also takes forms like 20240105 or
+    # 2024-W01-3 that would be stored verbatim and miss date lookups
+    try:
+        canonical = dt.date.fromisoformat(record["date"].strip()).isoformat()
+    except ValueError:
+        canonical = None
+    if canonical != record["date"].strip():
+        return None, f"Invalid date: {record['date']}"
+
+    students = record.get("present_students")
+    if not isinstance(students, list) or not all(isinstance(student, str) for student in students):
+        return None, "present_students must be a list of roll numbers"
+    students = [student for student in students if student]
+    if not students:
+        return None, "No students marked present"
+
+    return {
+        "type": "attendance",
+        "teacher_name": record["teacher_name"].strip(),
+        "date": record["date"].strip(),
+        "course": record["course"].strip(),
+        "year": record["year"].strip(),
+        "present_students": students
+    }, None
+
+def add_blocks(records, blockchain, on_append=None):
+    """
+    Validate attendance records and chain the valid ones onto the blockchain in one pass.
+    Returns one result per record: {"index": block index} or {"error": message}.
+    """
+    results = []
+    previous_block = blockchain[-1]
+    for record in records:
+        attendance_data, error = validate_attendance_record(record)
+        if error:
+            results.append({"error": error})
+            continue
+
+        block_to_add = next_block(previous_block, attendance_data, frozen=True)
+        blockchain.append(block_to_add)
+        for callback in on_append or ():
+            callback(block_to_add)
+        previous_block = block_to_add
+        results.append({"index": block_to_add.index})
+    return results
+
+def add_block(form, data, blockchain, on_append=None):
     """
-    Add a new attendance block to the blockchain
+    Add a new attendance block to the blockchain.
+    Each callable in on_append is called with the new block once it is in the chain,
+    so structures derived from the chain can be updated incrementally.
     """
     try:
         # Create attendance data structure
@@ -45,14 +112,16 @@ def add_block(form, data, blockchain):
 
         # Get the last block and create new block
         previous_block = blockchain[-1]
-        block_to_add = next_block(previous_block, attendance_data)
+        block_to_add = next_block(previous_block, attendance_data, frozen=True)
 
-        # Validate the new block
+        # Validate the new block (reuses the hash computed when it was created)
         if not block_to_add.is_valid():
             return "Error: Invalid block created!"
 
         # Add to blockchain
         blockchain.append(block_to_add)
+        for callback in on_append or ():
+            callback(block_to_add)
 
         return "Block #{} has been added to the blockchain! {} students marked present.".format(
             block_to_add.index, len(attendance_data["present_students"]))
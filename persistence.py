@@ -6,87 +6,444 @@ Handles saving and loading blockchain data to/from JSON files
 import json
 import os
 import datetime as dt
+from contextlib import nullcontext
+from itertools import islice
 from block import Block
+from blocklog import BlockLog, LogLock
+from backup_store import BackupStore
+from blockfile import BlockFile, JSON_BLOCKS_START, fields_to_block, fields_to_dict, fields_to_stored_block
+from blockfile import is_block_file, record_span, write_block_file, write_json_file
+from lazychain import LazyChain
+from checkpoints import verify_prefix
 
 BLOCKCHAIN_FILE = "blockchain_data.json"
 BACKUP_DIR = "blockchain_backups"
+LOG_DIR = "blockchain_log"
+BINARY_SUFFIX = ".blk"
+BINARY_FILE = "blockchain_data" + BINARY_SUFFIX
+
+# "json" rewrites the whole chain on every save, "log" appends new blocks to LOG_DIR
+# and "binary" keeps the chain in the compact format of blockfile.py
+STORAGE_MODE = os.environ.get("BLOCKENDANCE_STORAGE", "json")
+
+# Binary block files are opened as a LazyChain instead of being decoded up front
+LAZY_LOADING = os.environ.get("BLOCKENDANCE_LAZY", "0") == "1"
+
+# Open logs are kept around so appends don't have to re-scan the active segment
+_block_logs = {}
+
+def _get_block_log(log_dir):
+    key = os.path.abspath(log_dir)
+    if key not in _block_logs:
+        _block_logs[key] = BlockLog(log_dir)
+    return _block_logs[key]
+
+# The backup manifest is read once and then kept up to date in memory
+_backup_stores = {}
+
+def _get_backup_store(backup_dir=None):
+    if backup_dir is None:
+        backup_dir = BACKUP_DIR
+    key = os.path.abspath(backup_dir)
+    if key not in _backup_stores:
+        _backup_stores[key] = BackupStore(backup_dir)
+    return _backup_stores[key]
+
+def _parse_timestamp(value):
+    return dt.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def _block_from_dict(block_data):
+    """
+    Rebuild a block from its serialized form and verify the stored hash
+    """
+    # Convert timestamp string back to datetime
+    timestamp = _parse_timestamp(block_data["timestamp"])
+
+    # Create block object
+    block = Block(
+        index=block_data["index"],
+        timestamp=timestamp,
+        data=block_data["data"],
+        prev_hash=block_data["prev_hash"]
+    )
+
+    # Verify the hash matches
+    if block.hash != block_data["hash"]:
+        raise ValueError(f"Hash mismatch in block {block_data['index']}")
+
+    return block
+
+def _blocks_from_records(block_records, trusted=0):
+    """
+    Rebuild blocks from their serialized form. The first trusted blocks are
+    covered by a verified checkpoint and taken as stored; the rest are fully re-hashed.
+    """
+    blockchain = []
+    for position, block_data in enumerate(block_records):
+        if position < trusted:
+            blockchain.append(Block.from_stored(
+                block_data["index"],
+                _parse_timestamp(block_data["timestamp"]),
+                block_data["data"],
+                block_data["prev_hash"],
+                block_data["hash"]
+            ))
+        else:
+            blockchain.append(_block_from_dict(block_data))
+    return blockchain
+
+def _load_message(blockchain, trusted):
+    message = f"Blockchain loaded successfully: {len(blockchain)} blocks"
+    if trusted:
+        message += f" ({trusted} verified by checkpoint, {len(blockchain) - trusted} re-hashed)"
+    return message
 
 def save_blockchain(blockchain, filename=None):
     """
-    Save blockchain to JSON file
+    Save blockchain to JSON file, or append it to the block log in "log" storage mode
     """
     if filename is None:
+        if STORAGE_MODE == "log":
+            return save_blockchain_log(blockchain)
+        if STORAGE_MODE == "binary":
+            return save_blockchain_binary(blockchain)
         filename = BLOCKCHAIN_FILE
+    elif filename.endswith(BINARY_SUFFIX):
+        return save_blockchain_binary(blockchain, filename)
     
     try:
         # Convert blockchain to serializable format
-        blockchain_data = {
-            "metadata": {
-                "created": str(dt.datetime.now()),
-                "total_blocks": len(blockchain),
-                "version": "1.0"
-            },
-            "blocks": [block.to_dict() for block in blockchain]
+        block_records = [block.to_dict() for block in blockchain]
+        metadata = {
+            "created": str(dt.datetime.now()),
+            "total_blocks": len(blockchain),
+            "version": "1.0"
         }
+
+        # Written to a temporary file and swapped in, so a crash never leaves a torn file
+        write_json_file(filename, metadata, block_records)
         
-        # Ensure backup directory exists
-        os.makedirs(BACKUP_DIR, exist_ok=True)
-        
-        # Save to file
-        with open(filename, 'w') as f:
-            json.dump(blockchain_data, f, indent=2, default=str)
-        
-        # Create backup with timestamp
-        timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = os.path.join(BACKUP_DIR, f"blockchain_backup_{timestamp}.json")
-        with open(backup_filename, 'w') as f:
-            json.dump(blockchain_data, f, indent=2, default=str)
+        # Create an incremental backup holding only the blocks added since the last one
+        backup = _get_backup_store().create_backup(blockchain)
         
-        return True, f"Blockchain saved to {filename} and backed up to {backup_filename}"
+        return True, f"Blockchain saved to {filename} and backed up to {BACKUP_DIR} as {backup['name']}"
     
     except Exception as e:
         return False, f"Error saving blockchain: {str(e)}"
 
-def load_blockchain(filename=None):
+def load_blockchain(filename=None, lazy=None, paranoid=False):
     """
-    Load blockchain from JSON file
+    Load blockchain from JSON file.
+    Blocks covered by the checkpoint in the metadata are not re-hashed unless paranoid is set.
     """
     if filename is None:
-        filename = BLOCKCHAIN_FILE
+        filename = {"log": LOG_DIR, "binary": BINARY_FILE}.get(STORAGE_MODE, BLOCKCHAIN_FILE)
     
     try:
         if not os.path.exists(filename):
             return None, f"Blockchain file {filename} not found"
+
+        if os.path.isdir(filename):
+            return load_blockchain_log(filename)
+
+        if is_block_file(filename):
+            return load_blockchain_binary(filename, lazy, paranoid)
         
-        with open(filename, 'r') as f:
-            blockchain_data = json.load(f)
+        with open(filename, 'rb') as f:
+            raw = f.read()
+        blockchain_data = json.loads(raw)
         
         # Reconstruct blockchain from data
-        blockchain = []
-        for block_data in blockchain_data["blocks"]:
-            # Convert timestamp string back to datetime
-            timestamp = dt.datetime.fromisoformat(block_data["timestamp"].replace('Z', '+00:00'))
-            
-            # Create block object
-            block = Block(
-                index=block_data["index"],
-                timestamp=timestamp,
-                data=block_data["data"],
-                prev_hash=block_data["prev_hash"]
-            )
-            
-            # Verify the hash matches
-            if block.hash != block_data["hash"]:
-                return None, f"Hash mismatch in block {block_data['index']}"
-            
-            blockchain.append(block)
-        
         metadata = blockchain_data.get("metadata", {})
-        return blockchain, f"Blockchain loaded successfully: {metadata.get('total_blocks', 0)} blocks"
+        trusted = 0
+        start = raw.find(JSON_BLOCKS_START)
+        if not paranoid and start >= 0:
+            trusted = verify_prefix(metadata.get("checkpoint"), raw, start + len(JSON_BLOCKS_START))
+        try:
+            blockchain = _blocks_from_records(blockchain_data["blocks"], trusted)
+        except ValueError as e:
+            return None, str(e)
+
+        return blockchain, _load_message(blockchain, trusted)
     
     except Exception as e:
         return None, f"Error loading blockchain: {str(e)}"
 
+def save_blockchain_log(blockchain, log_dir=None):
+    """
+    Append the blocks that are not yet stored to the segmented block log.
+    Processes sharing the log must hold lock_blockchain_log() while they save.
+    """
+    if log_dir is None:
+        log_dir = LOG_DIR
+
+    try:
+        block_log = _get_block_log(log_dir)
+        # A refresh on another thread must not move the log between the check and the append
+        with block_log.lock:
+            # Take in what other workers appended, and drop a record one of them left
+            # half-written so the new blocks don't end up behind it
+            block_log.refresh()
+            block_log.truncate_torn_tail()
+            stored = block_log.record_count
+
+            # The log must hold a prefix of the in-memory chain
+            if stored > len(blockchain) or (stored and blockchain[stored - 1].hash != block_log.last_hash):
+                return False, f"Error saving blockchain: log in {log_dir} does not match the current chain"
+
+            appended = block_log.append_records([block.to_dict() for block in blockchain[stored:]])
+            total = block_log.record_count
+        return True, f"Blockchain appended {appended} new blocks to {log_dir} ({total} total)"
+
+    except Exception as e:
+        return False, f"Error saving blockchain: {str(e)}"
+
+def load_blockchain_log(log_dir=None):
+    """
+    Rebuild the blockchain from the segments of the block log
+    """
+    if log_dir is None:
+        log_dir = LOG_DIR
+
+    try:
+        if not os.path.isdir(log_dir):
+            return None, f"Blockchain log {log_dir} not found"
+
+        block_log = _get_block_log(log_dir)
+        # Another process may have appended since the log was opened
+        with block_log.lock:
+            block_log.refresh()
+            stored = block_log.record_count
+        if stored == 0:
+            return None, f"Blockchain log {log_dir} is empty"
+
+        blockchain = []
+        for block_data in block_log.iter_records():
+            try:
+                blockchain.append(_block_from_dict(block_data))
+            except ValueError as e:
+                return None, str(e)
+
+        message = f"Blockchain loaded successfully: {len(blockchain)} blocks from {log_dir}"
+        if block_log.recovered_bytes:
+            message += f" (truncated {block_log.recovered_bytes} bytes of torn tail record)"
+        return blockchain, message
+
+    except Exception as e:
+        return None, f"Error loading blockchain: {str(e)}"
+
+def lock_blockchain_log(log_dir=None):
+    """
+    Lock that processes sharing the block log hold while they change it
+    """
+    return LogLock(LOG_DIR if log_dir is None else log_dir)
+
+def repair_blockchain_log(log_dir=None):
+    """
+    Cut off a record a crashed worker left half-written at the end of the block log.
+    Only call this while holding lock_blockchain_log(), so no record is still being written.
+    """
+    block_log = _get_block_log(LOG_DIR if log_dir is None else log_dir)
+    with block_log.lock:
+        block_log.refresh()
+        return block_log.truncate_torn_tail()
+
+def blockchain_log_changed(log_dir=None):
+    """
+    Check cheaply whether another process may have appended to the block log
+    """
+    return _get_block_log(LOG_DIR if log_dir is None else log_dir).changed()
+
+def _verified_tail(blockchain, stored, records, source, committed_height=None):
+    """
+    Check that a store still holds the tip of blockchain and verify the blocks after it.
+    stored is the number of blocks in the store and records yields its blocks from
+    the position of the tip on, or from its last block if it holds fewer.
+    The store may hold fewer blocks than blockchain as long as it has the first
+    committed_height of them (all by default); the others are still being committed.
+    """
+    if committed_height is None:
+        committed_height = len(blockchain)
+    if stored < committed_height or not stored:
+        return None, f"{source} holds {stored} blocks, fewer than the current chain"
+
+    position = min(stored, len(blockchain)) - 1
+    records = iter(records)
+    prev_hash = blockchain[position].hash
+    if next(records)["hash"] != prev_hash:
+        return None, f"{source} does not match the current chain at block #{position}"
+    if stored < len(blockchain):
+        return [], f"{source} holds {stored} blocks; {len(blockchain) - stored} more are still being committed"
+
+    blocks = []
+    for block_data in records:
+        block = _block_from_dict(block_data)
+        if block.prev_hash != prev_hash:
+            return None, f"Block #{block.index} in {source} does not continue the current chain"
+        blocks.append(block)
+        prev_hash = block.hash
+    return blocks, f"Read {len(blocks)} new blocks from {source}"
+
+def load_blockchain_tail(blockchain, filename=None, committed_height=None):
+    """
+    Read and verify only the blocks stored after the last block of blockchain.
+    committed_height is how many blocks of blockchain were saved; storage may
+    lack the ones after it because their commit is still pending.
+    Returns the new blocks, or None when storage no longer continues the chain, and a message.
+    """
+    if filename is None:
+        filename = {"log": LOG_DIR, "binary": BINARY_FILE}.get(STORAGE_MODE, BLOCKCHAIN_FILE)
+
+    try:
+        if not blockchain or isinstance(blockchain, LazyChain):
+            return None, "Blockchain has to be loaded in full"
+        if not os.path.exists(filename):
+            return None, f"Blockchain file {filename} not found"
+
+        if os.path.isdir(filename):
+            return load_blockchain_log_tail(blockchain, filename, committed_height)
+
+        tip = len(blockchain) - 1
+        if is_block_file(filename):
+            with BlockFile(filename) as block_file:
+                # Step over the records up to the tip without decoding them
+                offset, stored, tip_offset, last_offset = block_file.first_offset, 0, None, None
+                while offset < len(block_file.buffer):
+                    if stored == tip:
+                        tip_offset = offset
+                    last_offset = offset
+                    _, offset = record_span(block_file.buffer, offset)
+                    stored += 1
+                start = tip_offset if tip_offset is not None else last_offset
+                records = (fields_to_dict(fields) for fields in block_file.iter_fields(start))
+                return _verified_tail(blockchain, stored, records, filename, committed_height)
+
+        # JSON has to be parsed in full, but only the new blocks are re-hashed
+        with open(filename, 'r') as f:
+            block_records = json.load(f)["blocks"]
+        start = max(min(tip, len(block_records) - 1), 0)
+        return _verified_tail(blockchain, len(block_records), islice(block_records, start, None), filename,
+                              committed_height)
+
+    except Exception as e:
+        return None, f"Error loading blockchain: {str(e)}"
+
+def load_blockchain_log_tail(blockchain, log_dir=None, committed_height=None):
+    """
+    Read and verify the blocks appended to the block log after the last block of blockchain.
+    Returns the new blocks, or None when the log no longer continues the chain, and a message.
+    """
+    if log_dir is None:
+        log_dir = LOG_DIR
+
+    try:
+        block_log = _get_block_log(log_dir)
+        with block_log.lock:
+            block_log.refresh()
+            stored = block_log.record_count
+        records = block_log.iter_records(max(min(len(blockchain), stored) - 1, 0))
+        return _verified_tail(blockchain, stored, records, log_dir, committed_height)
+
+    except Exception as e:
+        return None, f"Error loading blockchain: {str(e)}"
+
+def save_blockchain_binary(blockchain, filename=None):
+    """
+    Save blockchain to a binary block file
+    """
+    if filename is None:
+        filename = BINARY_FILE
+
+    try:
+        # A lazy chain over the same file only needs its new blocks appended
+        if isinstance(blockchain, LazyChain) and os.path.abspath(blockchain.filename) == os.path.abspath(filename):
+            appended = blockchain.flush()
+            return True, f"Blockchain appended {appended} new blocks to {filename}"
+
+        block_records = [block.to_dict() for block in blockchain]
+        metadata = {
+            "created": str(dt.datetime.now()),
+            "total_blocks": len(blockchain),
+            "version": "1.0"
+        }
+        write_block_file(filename, metadata, block_records)
+        return True, f"Blockchain saved to {filename}"
+
+    except Exception as e:
+        return False, f"Error saving blockchain: {str(e)}"
+
+def load_blockchain_binary(filename=None, lazy=None, paranoid=False):
+    """
+    Load blockchain from a binary block file, decoding blocks from the mapped file.
+    With lazy loading only the offset index is read and blocks are decoded on access.
+    """
+    if filename is None:
+        filename = BINARY_FILE
+    if lazy is None:
+        lazy = LAZY_LOADING
+
+    try:
+        if not os.path.exists(filename):
+            return None, f"Blockchain file {filename} not found"
+
+        if lazy:
+            blockchain = LazyChain(filename)
+            return blockchain, f"Blockchain opened lazily: {len(blockchain)} blocks indexed"
+
+        with BlockFile(filename) as block_file:
+            trusted = 0
+            if not paranoid:
+                trusted = verify_prefix(block_file.metadata.get("checkpoint"), block_file.buffer,
+                                        block_file.first_offset)
+            try:
+                blockchain = [fields_to_stored_block(fields) if position < trusted else fields_to_block(fields)
+                              for position, fields in enumerate(block_file.iter_fields())]
+            except ValueError as e:
+                return None, str(e)
+
+        return blockchain, _load_message(blockchain, trusted)
+
+    except Exception as e:
+        return None, f"Error loading blockchain: {str(e)}"
+
+CSV_FIELDNAMES = ['block_index', 'timestamp', 'type', 'teacher_name', 'course',
+                  'year', 'date', 'students_present', 'prev_hash', 'hash']
+
+# Streamed exports are sent in chunks of roughly this many characters
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def _csv_row(block):
+    """
+    CSV row for a genesis or attendance block, None for any other block
+    """
+    if block.data.get('type') == 'genesis':
+        return {
+            'block_index': block.index,
+            'timestamp': block.timestamp,
+            'type': 'genesis',
+            'teacher_name': '',
+            'course': '',
+            'year': '',
+            'date': '',
+            'students_present': '',
+            'prev_hash': block.prev_hash,
+            'hash': block.hash
+        }
+    elif block.data.get('type') == 'attendance':
+        return {
+            'block_index': block.index,
+            'timestamp': block.timestamp,
+            'type': 'attendance',
+            'teacher_name': block.data.get('teacher_name', ''),
+            'course': block.data.get('course', ''),
+            'year': block.data.get('year', ''),
+            'date': block.data.get('date', ''),
+            'students_present': ';'.join(block.data.get('present_students', [])),
+            'prev_hash': block.prev_hash,
+            'hash': block.hash
+        }
+    return None
+
 def export_blockchain_csv(blockchain, filename="blockchain_export.csv"):
     """
     Export blockchain data to CSV format
@@ -95,67 +452,86 @@ def export_blockchain_csv(blockchain, filename="blockchain_export.csv"):
         import csv
         
         with open(filename, 'w', newline='') as csvfile:
-            fieldnames = ['block_index', 'timestamp', 'type', 'teacher_name', 'course', 
-                         'year', 'date', 'students_present', 'prev_hash', 'hash']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
             
             writer.writeheader()
             for block in blockchain:
-                if block.data.get('type') == 'genesis':
-                    writer.writerow({
-                        'block_index': block.index,
-                        'timestamp': block.timestamp,
-                        'type': 'genesis',
-                        'teacher_name': '',
-                        'course': '',
-                        'year': '',
-                        'date': '',
-                        'students_present': '',
-                        'prev_hash': block.prev_hash,
-                        'hash': block.hash
-                    })
-                elif block.data.get('type') == 'attendance':
-                    writer.writerow({
-                        'block_index': block.index,
-                        'timestamp': block.timestamp,
-                        'type': 'attendance',
-                        'teacher_name': block.data.get('teacher_name', ''),
-                        'course': block.data.get('course', ''),
-                        'year': block.data.get('year', ''),
-                        'date': block.data.get('date', ''),
-                        'students_present': ';'.join(block.data.get('present_students', [])),
-                        'prev_hash': block.prev_hash,
-                        'hash': block.hash
-                    })
+                row = _csv_row(block)
+                if row is not None:
+                    writer.writerow(row)
         
         return True, f"Blockchain exported to {filename}"
     
     except Exception as e:
         return False, f"Error exporting blockchain: {str(e)}"
 
+class _Echo:
+    """
+    File-like object whose write() hands the text back, so csv can format rows without a file
+    """
+
+    def write(self, value):
+        return value
+
+def join_chunks(pieces, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Group small pieces of text into chunks of about chunk_size characters
+    """
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+def iter_blockchain_csv(blockchain):
+    """
+    Yield the CSV export in chunks, with the same content export_blockchain_csv writes
+    """
+    import csv
+
+    writer = csv.DictWriter(_Echo(), fieldnames=CSV_FIELDNAMES)
+
+    def rows():
+        yield writer.writerow(dict(zip(CSV_FIELDNAMES, CSV_FIELDNAMES)))
+        for block in blockchain:
+            row = _csv_row(block)
+            if row is not None:
+                yield writer.writerow(row)
+
+    return join_chunks(rows())
+
+def iter_blockchain_ndjson(blockchain):
+    """
+    Yield every block as one line of JSON in the v1.0 block layout, in chunks
+    """
+    return join_chunks(json.dumps(block.to_dict(), default=str) + "\n" for block in blockchain)
+
+def gzip_chunks(chunks, level=6):
+    """
+    Gzip a stream of text or byte chunks on the fly
+    """
+    import zlib
+
+    # wbits=31 makes zlib write a gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
 def get_blockchain_backups():
     """
     Get list of available blockchain backups
     """
     try:
-        if not os.path.exists(BACKUP_DIR):
-            return []
-        
-        backups = []
-        for filename in os.listdir(BACKUP_DIR):
-            if filename.startswith("blockchain_backup_") and filename.endswith(".json"):
-                filepath = os.path.join(BACKUP_DIR, filename)
-                stat = os.stat(filepath)
-                backups.append({
-                    'filename': filename,
-                    'filepath': filepath,
-                    'size': stat.st_size,
-                    'created': dt.datetime.fromtimestamp(stat.st_mtime)
-                })
-        
-        # Sort by creation time (newest first)
-        backups.sort(key=lambda x: x['created'], reverse=True)
-        return backups
+        return _get_backup_store().list_backups()
     
     except Exception as e:
         print(f"Error getting backups: {e}")
@@ -163,40 +539,54 @@ def get_blockchain_backups():
 
 def restore_from_backup(backup_filename):
     """
-    Restore blockchain from a backup file
+    Restore blockchain from a backup, as of the point the backup was taken
     """
     try:
-        backup_path = os.path.join(BACKUP_DIR, backup_filename)
-        blockchain, message = load_blockchain(backup_path)
+        backup_store = _get_backup_store()
+        entry = backup_store.get_entry(backup_filename)
+        if entry is not None and entry["chunks"] is not None:
+            blockchain = []
+            for block_data in backup_store.iter_records(backup_filename):
+                try:
+                    blockchain.append(_block_from_dict(block_data))
+                except ValueError as e:
+                    return None, f"Failed to load backup: {str(e)}"
+        else:
+            # Full JSON copies written before the manifest existed
+            backup_path = os.path.join(BACKUP_DIR, backup_filename)
+            blockchain, message = load_blockchain(backup_path)
+            if not blockchain:
+                return None, f"Failed to load backup: {message}"
         
-        if blockchain:
+        # The restored chain may not extend the log, so rewrite it from scratch,
+        # without other saves appending between the reset and the rewrite
+        with _get_block_log(LOG_DIR).lock if STORAGE_MODE == "log" else nullcontext():
+            if STORAGE_MODE == "log":
+                _get_block_log(LOG_DIR).reset()
+
             # Save as current blockchain
             success, save_message = save_blockchain(blockchain)
-            if success:
-                return blockchain, f"Restored from backup: {backup_filename}"
-            else:
-                return None, f"Failed to save restored blockchain: {save_message}"
+        if success:
+            return blockchain, f"Restored from backup: {backup_filename}"
         else:
-            return None, f"Failed to load backup: {message}"
+            return None, f"Failed to save restored blockchain: {save_message}"
     
     except Exception as e:
         return None, f"Error restoring from backup: {str(e)}"
 
 def cleanup_old_backups(keep_count=10):
     """
-    Clean up old backup files, keeping only the most recent ones
+    Clean up old backups, keeping only the most recent ones
     """
     try:
-        backups = get_blockchain_backups()
+        backup_store = _get_backup_store()
+        total = len(backup_store.list_backups())
         
-        if len(backups) <= keep_count:
-            return True, f"No cleanup needed. {len(backups)} backups found."
+        if total <= keep_count:
+            return True, f"No cleanup needed. {total} backups found."
         
-        # Remove old backups
-        removed_count = 0
-        for backup in backups[keep_count:]:
-            os.remove(backup['filepath'])
-            removed_count += 1
+        # Remove old backups and the chunks only they referenced
+        removed_count = backup_store.remove_old(keep_count)
         
         return True, f"Cleaned up {removed_count} old backups. Kept {keep_count} most recent."
     
@@ -7,10 +7,24 @@ Demonstrates core blockchain operations without the web interface
 import datetime as dt
 from block import Block
 from genesis import create_blockchain
-from newBlock import next_block, add_block
+from newBlock import next_block, add_block, add_blocks
 from checkChain import check_integrity, get_blockchain_stats
+from checkChain import IntegrityWatermark, check_integrity_incremental
 from persistence import save_blockchain, load_blockchain, export_blockchain_csv
-from analytics import get_attendance_analytics, generate_attendance_report
+from persistence import save_blockchain_log, load_blockchain_log
+from persistence import lock_blockchain_log, blockchain_log_changed, load_blockchain_log_tail
+from persistence import load_blockchain_tail
+from persistence import iter_blockchain_csv, iter_blockchain_ndjson, gzip_chunks
+from csvimport import import_blockchain_csv, import_csv_to_log, import_csv_to_storage
+from blockfile import json_to_binary, binary_to_json
+from analytics import AnalyticsState, get_attendance_analytics, generate_attendance_report
+from chainstore import ChainStore
+from chainwriter import ChainWriter
+from groupcommit import GroupCommitter
+from warmup import WarmUp
+from attendance_matrix import HAVE_NUMPY, get_attendance_rates
+from getBlock import RecordIndex, StudentIndex, DateIndex, find_records, search_by_student
+from getBlock import get_all_attendance_records, iter_attendance_records
 
 def test_blockchain_creation():
     """Test blockchain initialization"""
@@ -79,6 +93,210 @@ def test_multiple_blocks(blockchain):
     print(f"✅ Total blocks in chain: {len(blockchain)}")
     return blockchain
 
+def test_frozen_blocks(blockchain):
+    """Test that frozen blocks hash like regular blocks and reject changes"""
+    print("\n🧊 Testing Frozen Blocks...")
+
+    data = blockchain[1].data
+    frozen_block = next_block(blockchain[0], data, frozen=True)
+
+    # Same contents and timestamp must give the same hash
+    expected = Block(frozen_block.index, frozen_block.timestamp, data, frozen_block.prev_hash)
+    if frozen_block.hash == expected.hash and frozen_block.is_valid():
+        print(f"✅ Frozen block hash matches regular block: {frozen_block.hash[:20]}...")
+    else:
+        print("❌ Frozen block hash differs from regular block")
+
+    if frozen_block.serialized_size() == expected.serialized_size():
+        print(f"✅ Cached serialized size: {frozen_block.serialized_size()} characters")
+    else:
+        print("❌ Frozen block serialized size differs")
+
+    try:
+        frozen_block.data["teacher_name"] = "TAMPERED"
+        print("❌ Frozen block data was modified")
+    except TypeError:
+        print("✅ Frozen block data cannot be modified")
+
+def test_chain_store(blockchain):
+    """Test the column-based chain store against the block list"""
+    print("\n🗃️  Testing Compact Chain Store...")
+
+    store = ChainStore.from_blocks(blockchain)
+    if len(store) == len(blockchain) and all(
+            stored.to_dict() == block.to_dict() for stored, block in zip(store, blockchain)):
+        print(f"✅ Chain store holds {len(store)} identical blocks")
+    else:
+        print("❌ Chain store blocks differ from the block list")
+
+    result = check_integrity(store)
+    if result == check_integrity(blockchain):
+        print(f"✅ Chain store integrity: {result}")
+    else:
+        print(f"❌ Chain store integrity differs: {result}")
+
+    usage = store.memory_usage()
+    print(f"✅ Chain store memory: {usage['columns_bytes']} bytes of columns, "
+          f"{usage['unique_students']} unique students")
+
+def test_record_index(blockchain):
+    """Test that indexed record lookups match a full scan"""
+    print("\n🔎 Testing Record Index...")
+
+    record_index = RecordIndex.from_chain(blockchain)
+    queries = [{"name": block.data["teacher_name"], "date": block.data["date"],
+                "course": block.data["course"], "year": block.data["year"],
+                "number": str(len(block.data["present_students"]))}
+               for block in blockchain[1:]]
+    # Same record with the wrong student count must not be found
+    queries.append(dict(queries[0], number="99"))
+
+    if all(find_records(query, blockchain, record_index) == find_records(query, blockchain)
+           for query in queries):
+        print(f"✅ Indexed lookups match scans for {len(queries)} queries")
+    else:
+        print("❌ Indexed lookup differs from scan")
+
+    usage = record_index.memory_usage()
+    print(f"✅ Record index: {usage['entries']} entries, {usage['bytes']} bytes")
+
+def test_student_index(blockchain):
+    """Test that indexed student lookups match a full scan"""
+    print("\n🎓 Testing Student Index...")
+
+    student_index = StudentIndex.from_chain(blockchain)
+    roll_numbers = list(student_index.positions) + ["UNKNOWN-STUDENT"]
+    if all(search_by_student(blockchain, roll_no, student_index) == search_by_student(blockchain, roll_no)
+           for roll_no in roll_numbers):
+        print(f"✅ Indexed lookups match scans for {len(roll_numbers)} students")
+    else:
+        print("❌ Indexed student lookup differs from scan")
+
+    roll_no = blockchain[1].data["present_students"][0]
+    course = blockchain[1].data["course"]
+    records = search_by_student(blockchain, roll_no, student_index, course=course)
+    if records and all(record["course"] == course for record in records):
+        print(f"✅ Course filter: {roll_no} has {len(records)} {course} records")
+    else:
+        print(f"❌ Course filter failed for {roll_no}")
+
+def test_date_index(blockchain):
+    """Test date range queries through the date index"""
+    print("\n📅 Testing Date Index...")
+
+    date_index = DateIndex.from_chain(blockchain)
+    dates = sorted(block.data["date"] for block in blockchain[1:])
+    ranges = [(None, None), (dates[0], dates[0]), (dates[1], None), (None, dates[-2]), ("2099-01-01", None)]
+    if all(get_all_attendance_records(blockchain, date_index, date_from, date_to) ==
+           get_all_attendance_records(blockchain, None, date_from, date_to)
+           for date_from, date_to in ranges):
+        print(f"✅ Indexed range queries match scans for {len(ranges)} ranges")
+    else:
+        print("❌ Indexed range query differs from scan")
+
+    records = get_all_attendance_records(blockchain, date_index, dates[0], dates[-1], course="Physics")
+    if records and all(record["course"] == "Physics" for record in records):
+        print(f"✅ Course filter: {len(records)} Physics records")
+    else:
+        print("❌ Course filter failed")
+
+    # An index out of step with the chain never yields blocks outside the range
+    other_chain = list(blockchain[:1])
+    for block in blockchain[1:]:
+        add_block({"roll_no1": "X-01"}, ["Dr. Other", dates[0], "Other", "2024"], other_chain)
+    stale_index = DateIndex.from_chain(other_chain)
+    records = get_all_attendance_records(blockchain, stale_index, dates[0], dates[0])
+    if records and all(record["date"] == dates[0] for record in records):
+        print(f"✅ Stale index re-checked: {len(records)} records dated {dates[0]}")
+    else:
+        print(f"❌ Stale index returned records outside the range: {records}")
+
+def test_record_pagination(blockchain):
+    """Test walking the records one page at a time with a cursor"""
+    print("\n📄 Testing Record Pagination...")
+
+    from itertools import islice
+
+    pages, cursor = [], None
+    while True:
+        page = list(islice(iter_attendance_records(blockchain, after=cursor), 2))
+        if not page:
+            break
+        pages.extend(page)
+        cursor = page[-1]["block_index"]
+
+    if pages == get_all_attendance_records(blockchain):
+        print(f"✅ Paged walk returned all {len(pages)} records in order")
+    else:
+        print("❌ Paged walk differs from the full record list")
+
+def test_chain_writer(blockchain):
+    """Test concurrent appends through the single-writer queue"""
+    print("\n✍️  Testing Chain Writer...")
+
+    import threading
+
+    writer = ChainWriter(list(blockchain))
+    snapshot = writer.snapshot()
+
+    def append(chain, teacher):
+        result = add_block({"roll_no1": "W-01"}, [teacher, "2018-03-20", "Writing", "2024"], chain)
+        return chain[-1].index if "added" in result else None
+
+    indexes = []
+    def submit(teacher):
+        for _ in range(5):
+            indexes.append(writer.run(append, teacher))
+
+    threads = [threading.Thread(target=submit, args=(f"Teacher {t}",)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    expected = list(range(len(blockchain), len(blockchain) + 20))
+    if sorted(indexes) == expected and "verified" in check_integrity(writer.chain):
+        print(f"✅ 20 concurrent appends got distinct indexes {expected[0]}-{expected[-1]}")
+    else:
+        print(f"❌ Concurrent appends forked or lost blocks: {sorted(indexes)}")
+
+    if len(snapshot) == len(blockchain) and len(writer.chain) == len(blockchain) + 20:
+        print(f"✅ Snapshot still shows {len(snapshot)} blocks after the appends")
+    else:
+        print("❌ Snapshot changed after the appends")
+
+def test_batch_addition(blockchain):
+    """Test adding a batch of attendance records in one pass"""
+    print("\n📥 Testing Batch Addition...")
+
+    chain = list(blockchain)
+    records = [
+        {"teacher_name": "Dr. Batch", "date": "2018-03-22", "course": "Databases",
+         "year": "2024", "present_students": ["DB-2024-01", "DB-2024-02"]},
+        {"teacher_name": "Dr. Batch", "date": "22/03/2018", "course": "Databases",
+         "year": "2024", "present_students": ["DB-2024-01"]},
+        {"teacher_name": "Dr. Batch", "date": "20180322", "course": "Databases",
+         "year": "2024", "present_students": ["DB-2024-01"]},
+        {"teacher_name": "Dr. Batch", "date": "2018-03-23", "course": "Databases",
+         "year": "2024", "present_students": []},
+        {"teacher_name": "Dr. Batch", "date": "2018-03-24", "course": "Databases",
+         "year": "2024", "present_students": ["DB-2024-03"]}
+    ]
+    results = add_blocks(records, chain)
+
+    added = [result["index"] for result in results if "index" in result]
+    errors = [result["error"] for result in results if "error" in result]
+    if added == [len(blockchain), len(blockchain) + 1] and len(errors) == 3:
+        print(f"✅ Batch added blocks {added} and rejected {len(errors)} records")
+    else:
+        print(f"❌ Unexpected batch results: {results}")
+
+    if "verified" in check_integrity(chain):
+        print("✅ Batch-built chain passes the integrity check")
+    else:
+        print("❌ Batch-built chain failed the integrity check")
+
 def test_chain_integrity(blockchain):
     """Test blockchain integrity verification"""
     print("\n🔒 Testing Chain Integrity...")
@@ -95,6 +313,79 @@ def test_chain_integrity(blockchain):
 
     return result
 
+def test_parallel_verification(blockchain):
+    """Test that parallel verification reports the same result as the sequential check"""
+    print("\n⚡ Testing Parallel Verification...")
+
+    from verifier import find_first_failure
+
+    # Tiny chunks so the chain is split across several workers
+    failure = find_first_failure(blockchain, workers=2, chunk_size=2)
+    if failure is None:
+        print("✅ Parallel verification found no invalid blocks")
+    else:
+        print(f"❌ Parallel verification failed: {failure}")
+
+    original_data = blockchain[2].data.copy()
+    blockchain[2].data["teacher_name"] = "TAMPERED"
+    failure = find_first_failure(blockchain, workers=2, chunk_size=2)
+    expected = check_integrity(blockchain, workers=1)
+    blockchain[2].data = original_data
+    if failure == expected:
+        print(f"✅ Parallel check matches sequential check: {failure}")
+    else:
+        print(f"❌ Parallel check reported {failure}, expected {expected}")
+
+    # A kept pool only sends the blocks appended since its workers started
+    from verifier import VerifierPool
+    from chainwriter import ChainSnapshot
+    chain = list(blockchain)
+    with VerifierPool(workers=2) as pool:
+        first = pool.find_first_failure(ChainSnapshot(chain), chunk_size=2)
+        chain.append(next_block(chain[-1], {"type": "attendance", "teacher_name": "Late"}))
+        chain[-1].data["teacher_name"] = "TAMPERED"
+        appended = pool.find_first_failure(ChainSnapshot(chain), chunk_size=2)
+        replaced = pool.find_invalid_blocks(chain[:-1], chunk_size=2)
+    if first is None and appended == f"Error: Block #{len(chain) - 1} has invalid hash" and replaced == []:
+        print(f"✅ Kept verifier pool checks appended blocks: {appended}")
+    else:
+        print(f"❌ Kept verifier pool reported {first}, {appended}, {replaced}")
+
+def test_incremental_integrity(blockchain):
+    """Test integrity checks that only cover blocks past the watermark"""
+    print("\n🔖 Testing Incremental Integrity Verification...")
+
+    watermark = IntegrityWatermark()
+    result = check_integrity_incremental(blockchain[:-1], watermark)
+    print(f"✅ First check (full): {result}")
+
+    result = check_integrity_incremental(blockchain, watermark)
+    if "1 new since last check" in result and watermark.height == len(blockchain):
+        print(f"✅ Second check (incremental): {result}")
+    else:
+        print(f"❌ Incremental check did not use the watermark: {result}")
+
+def test_merkle_proofs(blockchain):
+    """Test Merkle inclusion proofs and tamper localization"""
+    print("\n🌳 Testing Merkle Proofs...")
+
+    from merkle import MerkleMountainRange, verify_proof, locate_tampering
+
+    tree = MerkleMountainRange.from_chain(blockchain)
+    if all(verify_proof(block.hash, tree.proof(i)) for i, block in enumerate(blockchain)):
+        print(f"✅ Inclusion proofs verified for {len(tree)} blocks (root {tree.root()[:16]}...)")
+    else:
+        print("❌ Inclusion proof verification failed")
+
+    original_data = blockchain[2].data.copy()
+    blockchain[2].data["teacher_name"] = "TAMPERED"
+    location = locate_tampering(blockchain, tree)
+    blockchain[2].data = original_data
+    if location == 2:
+        print(f"✅ Tampering located at block #{location}")
+    else:
+        print(f"❌ Tampering located at {location}, expected block #2")
+
 def test_tamper_detection(blockchain):
     """Test tamper detection by modifying a block"""
     print("\n🚨 Testing Tamper Detection...")
@@ -157,6 +448,503 @@ def test_persistence(blockchain):
     success, message = export_blockchain_csv(blockchain, "test_export.csv")
     print(f"✅ CSV export: {message}")
 
+def test_streamed_exports(blockchain):
+    """Test that streamed exports match the file exports"""
+    print("\n📤 Testing Streamed Exports...")
+
+    import gzip
+    import json
+
+    # test_persistence wrote test_export.csv from the same chain
+    with open("test_export.csv", newline='') as f:
+        expected_csv = f.read()
+    streamed_csv = "".join(iter_blockchain_csv(blockchain))
+    if streamed_csv == expected_csv:
+        print(f"✅ Streamed CSV matches file export ({len(streamed_csv)} characters)")
+    else:
+        print("❌ Streamed CSV differs from file export")
+
+    compressed = b"".join(gzip_chunks(iter_blockchain_ndjson(blockchain)))
+    lines = gzip.decompress(compressed).decode('utf-8').splitlines()
+    if [json.loads(line)["hash"] for line in lines] == [block.hash for block in blockchain]:
+        print(f"✅ Gzipped NDJSON export: {len(lines)} blocks in {len(compressed)} bytes")
+    else:
+        print("❌ Gzipped NDJSON export differs from the chain")
+
+def test_csv_import(blockchain):
+    """Test importing CSV exports and hashless rows"""
+    print("\n📥 Testing CSV Import...")
+
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_file = os.path.join(tmp_dir, "export.csv")
+        export_blockchain_csv(blockchain, export_file)
+
+        imported = []
+        success, message = import_blockchain_csv(export_file, imported)
+        if success and [b.hash for b in imported] == [b.hash for b in blockchain]:
+            print(f"✅ Round trip: {message}")
+        else:
+            print(f"❌ Round trip failed: {message}")
+
+        # Hashed rows are rebuilt exactly as stored, without the checks new rows get
+        odd_chain = list(blockchain)
+        add_block({"roll_no1": "CS-01 ", "roll_no2": "CS-02"}, ["Dr. Odd", "16/03/2018", "Legacy", "2018"], odd_chain)
+        odd_file = os.path.join(tmp_dir, "odd.csv")
+        export_blockchain_csv(odd_chain, odd_file)
+        odd_imported = []
+        success, message = import_blockchain_csv(odd_file, odd_imported)
+        if success and odd_imported[-1].hash == odd_chain[-1].hash:
+            print(f"✅ Unvalidated stored block imported: {message}")
+        else:
+            print(f"❌ Stored block rejected: {message}")
+
+        # Re-importing the same export adds nothing
+        success, message = import_blockchain_csv(export_file, imported)
+        print(f"✅ Re-import: {message}" if success and len(imported) == len(blockchain)
+              else f"❌ Re-import changed the chain: {message}")
+
+        with open(export_file) as f:
+            lines = f.read().splitlines()
+        tampered_file = os.path.join(tmp_dir, "tampered.csv")
+        with open(tampered_file, "w") as f:
+            f.write("\n".join(lines[:2] + [lines[2].replace("2024", "2025", 1)] + lines[3:]) + "\n")
+        success, message = import_blockchain_csv(tampered_file, [])
+        print(f"✅ Tampered row rejected: {message}" if not success else "❌ Tampered row was imported")
+
+        roster_file = os.path.join(tmp_dir, "roster.csv")
+        with open(roster_file, "w") as f:
+            f.write("teacher_name,date,course,year,students_present\n")
+            f.write("Dr. Roster,2018-03-22,Imports,2024,R-01;R-02\n")
+            f.write("Dr. Roster,2018-03-23,Imports,2024,R-01\n")
+
+        log_dir = os.path.join(tmp_dir, "log")
+        import_csv_to_log(export_file, log_dir, batch_size=2)
+        success, message = import_csv_to_log(roster_file, log_dir)
+        loaded_blockchain, load_message = load_blockchain_log(log_dir)
+        if (success and len(loaded_blockchain) == len(blockchain) + 2 and
+                check_integrity(loaded_blockchain).startswith("Blockchain integrity verified") and
+                loaded_blockchain[-1].data["present_students"] == ["R-01"]):
+            print(f"✅ Roster rows appended: {message}")
+        else:
+            print(f"❌ Roster import failed: {message}")
+
+        # Without a log directory the import goes to the configured storage mode
+        import persistence
+        saved_config = persistence.STORAGE_MODE, persistence.BLOCKCHAIN_FILE, persistence.BACKUP_DIR
+        persistence.STORAGE_MODE = "json"
+        persistence.BLOCKCHAIN_FILE = os.path.join(tmp_dir, "chain.json")
+        persistence.BACKUP_DIR = os.path.join(tmp_dir, "backups")
+        try:
+            save_blockchain(blockchain)
+            success, message = import_csv_to_storage(roster_file)
+            stored_blockchain, _ = load_blockchain()
+        finally:
+            persistence.STORAGE_MODE, persistence.BLOCKCHAIN_FILE, persistence.BACKUP_DIR = saved_config
+        if (success and len(stored_blockchain) == len(blockchain) + 2 and
+                stored_blockchain[0].hash == blockchain[0].hash and not os.path.exists("blockchain_log")):
+            print(f"✅ Roster imported into the JSON chain: {message}")
+        else:
+            print(f"❌ Roster import ignored the storage mode: {message}")
+
+def test_group_commit(blockchain):
+    """Test that concurrent appends share group commits"""
+    print("\n📦 Testing Group Commit...")
+
+    import os
+    import tempfile
+    import threading
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_dir = os.path.join(tmp_dir, "log")
+        writer = ChainWriter(list(blockchain))
+        committer = GroupCommitter(lambda chain: save_blockchain_log(chain, log_dir), writer.snapshot)
+
+        def append(chain, teacher):
+            add_block({"roll_no1": "G-01"}, [teacher, "2018-03-21", "Commit", "2024"], chain)
+            return len(chain), chain[-1].hash
+
+        results = []
+        def submit(teacher):
+            for _ in range(5):
+                results.append(committer.request(*writer.run(append, teacher)).result())
+
+        threads = [threading.Thread(target=submit, args=(f"Teacher {t}",)) for t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        committer.close()
+        writer.close()
+
+        loaded_blockchain, load_message = load_blockchain_log(log_dir)
+        if all(success for success, _ in results) and len(loaded_blockchain) == len(writer.chain):
+            print(f"✅ 20 appends made durable in {committer.commits} commits")
+        else:
+            print(f"❌ Group commit lost blocks: {load_message}")
+
+        # A block dropped by a chain replacement before its commit is not reported saved
+        writer = ChainWriter(list(blockchain))
+        replaced_dir = os.path.join(tmp_dir, "replaced")
+        committer = GroupCommitter(lambda chain: save_blockchain_log(chain, replaced_dir), writer.snapshot,
+                                   window=0.2)
+        future = committer.request(*writer.run(append, "Replaced Teacher"))
+        writer.run(lambda chain: writer.replace(list(blockchain)))
+        success, message = future.result()
+        committer.close()
+        writer.close()
+        if not success:
+            print(f"✅ Replaced block not reported saved: {message}")
+        else:
+            print(f"❌ Replaced block reported saved: {message}")
+
+def test_warm_up(blockchain):
+    """Test the background warm-up and its progress reports"""
+    print("\n🔥 Testing Background Warm-up...")
+
+    import threading
+
+    release = threading.Event()
+    def target(progress):
+        progress.begin("loading")
+        release.wait()
+        progress.begin("verifying", f"{len(blockchain)} blocks loaded")
+        return check_integrity(blockchain)
+
+    warm_up = WarmUp(target).start()
+    if not warm_up.wait(0.05) and warm_up.status()["phase"] == "loading":
+        print("✅ Not ready while loading")
+    else:
+        print("❌ Warm-up reported ready too early")
+    release.set()
+
+    status = warm_up.status() if warm_up.wait(5) else None
+    if status and [step["phase"] for step in status["completed"]] == ["loading", "verifying"]:
+        print(f"✅ Ready after {status['elapsed_seconds']}s: {status['completed'][-1]['note']}")
+    else:
+        print(f"❌ Warm-up did not finish: {warm_up.status()}")
+
+    def failing(progress):
+        progress.begin("loading")
+        raise ValueError("Hash mismatch in block 3")
+    failed = WarmUp(failing).start()
+    if not failed.wait(5) and failed.status()["phase"] == "failed":
+        print(f"✅ Failed warm-up reported: {failed.error}")
+    else:
+        print("❌ Failed warm-up not reported")
+
+def test_incremental_backups(blockchain):
+    """Test that backups merge chunks logarithmically and keep an append-only manifest"""
+    print("\n🗄️ Testing Incremental Backups...")
+
+    import os
+    import shutil
+    import tempfile
+    from backup_store import BackupStore
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Full copies from before the manifest are imported into it once
+        legacy = os.path.join(tmp_dir, "blockchain_backup_20180101_000000.json")
+        shutil.copy("demo_blockchain.json", legacy)
+        os.utime(legacy, (0, 0))
+
+        store = BackupStore(tmp_dir)
+        chain = list(blockchain)
+        manifest_sizes = []
+        for i in range(200):
+            add_block({"roll_no1": f"B-{i:03d}"}, ["Dr. Backup", "2018-03-24", "Backups", "2024"], chain)
+            store.create_backup(chain)
+            manifest_sizes.append(os.path.getsize(store.manifest_path))
+
+        entries = store.entries[1:]
+        most_chunks = max(len(entry["chunks"]) for entry in entries)
+        line_sizes = [after - before for before, after in zip(manifest_sizes, manifest_sizes[1:])]
+        restored = [record["hash"] for record in BackupStore(tmp_dir).iter_records(entries[-1]["name"])]
+        if (most_chunks <= 9 and max(line_sizes) < 1024 and
+                restored == [b.hash for b in chain]):
+            print(f"✅ {len(entries)} backups with at most {most_chunks} chunks, manifest lines up to {max(line_sizes)} bytes")
+        else:
+            print("❌ Backups stopped being incremental")
+
+        listed = [backup["filename"] for backup in store.list_backups()]
+        removed = store.remove_old(5)
+        reopened = BackupStore(tmp_dir)
+        if (listed[-1] == "blockchain_backup_20180101_000000.json" and removed == len(listed) - 5 and
+                not os.path.exists(legacy) and len(reopened.entries) == 5 and
+                [record["hash"] for record in reopened.iter_records(entries[-1]["name"])] == restored):
+            print(f"✅ Legacy backup listed and cleaned up with {removed - 1} manifest backups")
+        else:
+            print("❌ Legacy backup not handled")
+
+def test_block_log(blockchain):
+    """Test the append-only segmented block log"""
+    print("\n🗂️ Testing Segmented Block Log...")
+
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_dir = os.path.join(tmp_dir, "log")
+
+        # Save in two steps, the second one only appends the new blocks
+        success, message = save_blockchain_log(blockchain[:2], log_dir)
+        print(f"✅ First append: {message}")
+        success, message = save_blockchain_log(blockchain, log_dir)
+        print(f"✅ Second append: {message}")
+
+        loaded_blockchain, load_message = load_blockchain_log(log_dir)
+        if loaded_blockchain and [b.hash for b in loaded_blockchain] == [b.hash for b in blockchain]:
+            print(f"✅ Log load result: {load_message}")
+        else:
+            print(f"❌ Log load failed: {load_message}")
+
+        # Appends on one thread while another refreshes the same log
+        import threading
+        chain, done = list(blockchain), threading.Event()
+
+        def refresh():
+            while not done.is_set():
+                load_blockchain_log_tail(chain[:1], log_dir)
+
+        refresher = threading.Thread(target=refresh)
+        refresher.start()
+        results = []
+        for _ in range(50):
+            chain.append(next_block(chain[-1], dict(chain[-1].data)))
+            results.append(save_blockchain_log(chain, log_dir)[0])
+        done.set()
+        refresher.join()
+
+        loaded_blockchain, load_message = load_blockchain_log(log_dir)
+        if all(results) and loaded_blockchain and len(loaded_blockchain) == len(chain):
+            print(f"✅ Concurrent appends and refreshes: {load_message}")
+        else:
+            print(f"❌ Concurrent appends and refreshes lost track of the log: {load_message}")
+
+def test_shared_log(blockchain):
+    """Test picking up blocks another process appended to the block log"""
+    print("\n🔀 Testing Shared Block Log...")
+
+    import os
+    import tempfile
+    from blocklog import BlockLog, HAVE_FILE_LOCKS
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_dir = os.path.join(tmp_dir, "log")
+        save_blockchain_log(blockchain[:2], log_dir)
+
+        # A second BlockLog stands in for another worker's view of the same directory
+        with lock_blockchain_log(log_dir):
+            if HAVE_FILE_LOCKS and lock_blockchain_log(log_dir).acquire(blocking=False):
+                print("❌ Log lock was acquired twice")
+            other = BlockLog(log_dir)
+            other.append_records([block.to_dict() for block in blockchain[2:]])
+
+        changed = blockchain_log_changed(log_dir)
+        blocks, message = load_blockchain_log_tail(blockchain[:2], log_dir)
+        if changed and blocks is not None and [b.hash for b in blocks] == [b.hash for b in blockchain[2:]]:
+            print(f"✅ Tail picked up: {message}")
+        else:
+            print(f"❌ Tail not picked up: {message}")
+
+        if not blockchain_log_changed(log_dir) and load_blockchain_log_tail(blockchain, log_dir)[0] == []:
+            print("✅ Up-to-date chain needs no reload")
+        else:
+            print("❌ Up-to-date chain reported as changed")
+
+        blocks, message = load_blockchain_log_tail(blockchain[:1] + [blockchain[2]], log_dir)
+        print(f"✅ Diverged chain detected: {message}" if blocks is None else "❌ Diverged chain not detected")
+
+        # A worker that died partway through an append leaves a torn record behind
+        from blocklog import encode_record
+        segment = os.path.join(log_dir, max(name for name in os.listdir(log_dir) if name.startswith("segment_")))
+        longer = blockchain + [next_block(blockchain[-1], dict(blockchain[-1].data))]
+        with open(segment, 'ab') as f:
+            f.write(encode_record(longer[-1].to_dict())[:20])
+        torn_size = os.path.getsize(segment)
+        if BlockLog(log_dir).record_count == len(blockchain) and os.path.getsize(segment) == torn_size:
+            print("✅ Opening the log leaves a possibly unfinished record alone")
+        else:
+            print("❌ Opening the log cut off a record")
+
+        third = BlockLog(log_dir)
+        with lock_blockchain_log(log_dir):
+            success, message = save_blockchain_log(longer, log_dir)
+        if (success and third.refresh() == 1 and not third.changed() and
+                BlockLog(log_dir).record_count == len(longer)):
+            print(f"✅ Append after a torn record is seen by other workers: {message}")
+        else:
+            print(f"❌ Append after a torn record is lost: {message}")
+
+def test_tail_reload(blockchain):
+    """Test reading only the blocks saved past the tip of a chain"""
+    print("\n⏩ Testing Tail Reload...")
+
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in ("chain.json", "chain.blk"):
+            filename = os.path.join(tmp_dir, name)
+            save_blockchain(blockchain, filename)
+
+            blocks, message = load_blockchain_tail(blockchain[:2], filename)
+            if blocks is not None and [b.hash for b in blocks] == [b.hash for b in blockchain[2:]]:
+                print(f"✅ {name}: {message}")
+            else:
+                print(f"❌ {name} tail reload failed: {message}")
+
+            diverged = blockchain[:1] + [next_block(blockchain[0], {"type": "other"})]
+            blocks, message = load_blockchain_tail(diverged, filename)
+            print(f"✅ {name} divergence detected: {message}" if blocks is None
+                  else f"❌ {name} divergence not detected")
+
+            # Blocks still waiting for their commit are kept, blocks lost from storage are not
+            longer = blockchain + [next_block(blockchain[-1], {"type": "other"})]
+            pending, message = load_blockchain_tail(longer, filename, committed_height=len(blockchain))
+            lost, _ = load_blockchain_tail(longer, filename)
+            if pending == [] and lost is None:
+                print(f"✅ {name} pending commits kept: {message}")
+            else:
+                print(f"❌ {name} pending commits mishandled: {message}")
+
+def test_binary_format(blockchain):
+    """Test the binary block format and the JSON converters"""
+    print("\n🧱 Testing Binary Block Format...")
+
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = os.path.join(tmp_dir, "chain.json")
+        binary_file = os.path.join(tmp_dir, "chain.blk")
+        round_trip_file = os.path.join(tmp_dir, "round_trip.json")
+
+        save_blockchain(blockchain, json_file)
+        count = json_to_binary(json_file, binary_file)
+        print(f"✅ Converted {count} blocks to binary ({os.path.getsize(binary_file)} bytes)")
+
+        loaded_blockchain, load_message = load_blockchain(binary_file)
+        if loaded_blockchain and [b.hash for b in loaded_blockchain] == [b.hash for b in blockchain]:
+            print(f"✅ Binary load result: {load_message}")
+        else:
+            print(f"❌ Binary load failed: {load_message}")
+
+        binary_to_json(binary_file, round_trip_file)
+        with open(json_file) as original, open(round_trip_file) as converted:
+            if original.read() == converted.read():
+                print("✅ JSON round trip is lossless")
+            else:
+                print("❌ JSON round trip changed the file")
+
+def test_lazy_chain(blockchain):
+    """Test lazy, offset-indexed loading of a binary block file"""
+    print("\n💤 Testing Lazy Chain Loading...")
+
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        binary_file = os.path.join(tmp_dir, "chain.blk")
+        save_blockchain(blockchain[:-1], binary_file)
+
+        lazy_chain, load_message = load_blockchain(binary_file, lazy=True)
+        print(f"✅ Lazy load result: {load_message}")
+
+        # Append the last block and persist only that one
+        lazy_chain.append(blockchain[-1])
+        success, message = save_blockchain(lazy_chain, binary_file)
+        print(f"✅ Lazy save result: {message}")
+
+        reopened, _ = load_blockchain(binary_file, lazy=True)
+        if (len(reopened) == len(blockchain) and reopened[-1].hash == blockchain[-1].hash and
+                [b.index for b in reopened[1:3]] == [1, 2]):
+            print(f"✅ Reopened lazy chain: {check_integrity(reopened)}")
+        else:
+            print("❌ Reopened lazy chain does not match")
+
+        # Readers keep decoding while flushes remap the growing file
+        import threading
+        from newBlock import next_block
+        errors, done = [], threading.Event()
+
+        def read_blocks():
+            position = 0
+            while not done.is_set():
+                index = position % len(reopened)
+                try:
+                    if reopened[index].index != index:
+                        errors.append(index)
+                except Exception as e:
+                    errors.append(repr(e))
+                    return
+                position += 7
+
+        readers = [threading.Thread(target=read_blocks) for _ in range(3)]
+        for reader in readers:
+            reader.start()
+        for _ in range(30):
+            reopened.append(next_block(reopened[-1], dict(reopened[-1].data), frozen=True))
+            reopened.flush()
+        done.set()
+        for reader in readers:
+            reader.join()
+        if errors:
+            print(f"❌ Concurrent lazy reads failed: {errors[:3]}")
+        else:
+            print(f"✅ Concurrent lazy reads during {len(reopened) - len(blockchain)} flushes")
+        lazy_chain.close()
+        reopened.close()
+
+def test_checkpoints(blockchain):
+    """Test loading with verification checkpoints"""
+    print("\n📍 Testing Verification Checkpoints...")
+
+    import os
+    import tempfile
+    import checkpoints
+
+    # Use a tiny interval so the test chain gets a checkpoint
+    original_interval = checkpoints.CHECKPOINT_INTERVAL
+    checkpoints.CHECKPOINT_INTERVAL = 2
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_file = os.path.join(tmp_dir, "chain.json")
+            save_blockchain(blockchain, json_file)
+
+            loaded_blockchain, load_message = load_blockchain(json_file)
+            if loaded_blockchain and "verified by checkpoint" in load_message:
+                print(f"✅ Checkpoint load: {load_message}")
+            else:
+                print(f"❌ Checkpoint not used: {load_message}")
+
+            loaded_blockchain, load_message = load_blockchain(json_file, paranoid=True)
+            if loaded_blockchain and "verified by checkpoint" not in load_message:
+                print(f"✅ Paranoid load: {load_message}")
+            else:
+                print(f"❌ Paranoid load failed: {load_message}")
+
+            binary_file = os.path.join(tmp_dir, "chain.blk")
+            save_blockchain(blockchain, binary_file)
+            loaded_blockchain, load_message = load_blockchain(binary_file)
+            if loaded_blockchain and "verified by checkpoint" in load_message:
+                print(f"✅ Binary checkpoint load: {load_message}")
+            else:
+                print(f"❌ Binary checkpoint not used: {load_message}")
+
+            # Editing a block inside the checkpointed prefix voids the checkpoint
+            with open(json_file) as f:
+                content = f.read()
+            with open(json_file, "w") as f:
+                f.write(content.replace("Dr. Smith", "Dr. Smyth", 1))
+            loaded_blockchain, load_message = load_blockchain(json_file)
+            print(f"✅ Edited prefix re-hashed: {load_message}" if loaded_blockchain is None
+                  else "❌ Edited prefix was trusted")
+    finally:
+        checkpoints.CHECKPOINT_INTERVAL = original_interval
+
 def test_analytics(blockchain):
     """Test blockchain analytics features"""
     print("\n📊 Testing Blockchain Analytics...")
@@ -177,6 +965,115 @@ def test_analytics(blockchain):
     json_report = generate_attendance_report(blockchain, format='json')
     print(f"✅ Generated JSON report ({len(json_report)} characters)")
 
+def test_analytics_state(blockchain):
+    """Test that incrementally updated analytics match a full rebuild"""
+    print("\n📈 Testing Incremental Analytics...")
+
+    import json
+
+    # Feed the blocks one at a time, as add_block does
+    state = AnalyticsState()
+    for block in blockchain:
+        state.add_block(block)
+
+    incremental = json.dumps(get_attendance_analytics(blockchain, state), default=str)
+    rebuilt = json.dumps(get_attendance_analytics(blockchain), default=str)
+    if incremental == rebuilt:
+        print(f"✅ Incremental analytics match full rebuild ({len(incremental)} characters)")
+    else:
+        print("❌ Incremental analytics differ from full rebuild")
+
+    # A copy keeps rendering the blocks it was taken for while the state moves on
+    copy = state.copy()
+    state.add_block(next_block(blockchain[-1], dict(blockchain[-1].data)))
+    if json.dumps(get_attendance_analytics(blockchain, copy), default=str) == rebuilt:
+        print(f"✅ Copied analytics unaffected by {state.total_blocks - copy.total_blocks} later block")
+    else:
+        print("❌ Copied analytics changed with the state")
+
+    stats = get_blockchain_stats(blockchain, state=copy)
+    if stats == get_blockchain_stats(blockchain):
+        print(f"✅ Stats from running aggregates match a scan: {stats['total_attendance_records']} records")
+    else:
+        print("❌ Stats from running aggregates differ from a scan")
+
+def test_attendance_matrix(blockchain):
+    """Test that analytics and reports built from the matrix match the running aggregates"""
+    print("\n🧮 Testing Attendance Matrix...")
+
+    import json
+
+    state = AnalyticsState.from_chain(blockchain)
+    scanned = json.dumps(get_attendance_analytics(blockchain), default=str)
+    if scanned == json.dumps(get_attendance_analytics(blockchain, state), default=str):
+        print(f"✅ Scanned analytics match running aggregates (NumPy available: {HAVE_NUMPY})")
+    else:
+        print("❌ Scanned analytics differ from running aggregates")
+
+    if all(generate_attendance_report(blockchain, format) == generate_attendance_report(blockchain, format, state)
+           for format in ("text", "json")):
+        print("✅ Scanned reports match reports from running aggregates")
+    else:
+        print("❌ Scanned reports differ from reports from running aggregates")
+
+    # A student's rate counts the sessions of every course they attended
+    chain = list(blockchain)
+    add_block({"roll_no1": "RATE-01", "roll_no2": "RATE-02"}, ["Dr. Rate", "2018-03-26", "Rates", "2024"], chain)
+    add_block({"roll_no1": "RATE-01"}, ["Dr. Rate", "2018-03-27", "Rates", "2024"], chain)
+    add_block({"roll_no1": "RATE-02"}, ["Dr. Rate", "2018-03-27", "Other Rates", "2024"], chain)
+    rates = get_attendance_rates(chain, use_numpy=False)
+    if ((not HAVE_NUMPY or get_attendance_rates(chain, use_numpy=True) == rates) and
+            rates["RATE-01"] == 1.0 and rates["RATE-02"] == 2 / 3):
+        print(f"✅ Attendance rates for {len(rates)} students match with and without NumPy")
+    else:
+        print(f"❌ Unexpected attendance rates: {rates}")
+
+def test_cached_stats(blockchain):
+    """Test ETags and 304 answers of the cached /api/stats endpoint"""
+    print("\n🏷️ Testing Cached Stats...")
+
+    import os
+    import tempfile
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The server keeps its chain and backups in the working directory
+        os.chdir(tmp_dir)
+        try:
+            import blockchain as server
+            if not server.warmup.wait(30):
+                print(f"❌ Server warm-up did not finish: {server.warmup.status()}")
+                return
+            client = server.app.test_client()
+
+            first = client.get('/api/stats')
+            etag = first.headers.get('ETag')
+            repeat = client.get('/api/stats', headers={'If-None-Match': etag})
+            if first.status_code == 200 and etag and repeat.status_code == 304 and repeat.headers.get('ETag') == etag:
+                print(f"✅ Stats served with ETag {etag} and answered 304 on repeat")
+            else:
+                print(f"❌ Unexpected cached stats: {first.status_code} {etag} then {repeat.status_code}")
+
+            client.post('/', data={"teacher_name": "Dr. Cache", "date": "2018-03-28", "course": "Caching",
+                                   "year": "2024", "roll_no1": "C-01"})
+            appended = client.get('/api/stats', headers={'If-None-Match': etag})
+            appended_etag = appended.headers.get('ETag')
+            if appended.status_code == 200 and appended_etag != etag and appended.get_json()["total_blocks"] == first.get_json()["total_blocks"] + 1:
+                print(f"✅ New ETag after an append: {appended_etag}")
+            else:
+                print(f"❌ Stats not refreshed after an append: {appended.status_code}")
+
+            # Checking the integrity moves the watermark without adding blocks
+            client.get('/result.html')
+            checked = client.get('/api/stats', headers={'If-None-Match': appended_etag})
+            if (checked.status_code == 200 and checked.headers.get('ETag') != appended_etag and
+                    checked.get_json()["total_blocks"] == appended.get_json()["total_blocks"]):
+                print(f"✅ New ETag after the watermark moved: {checked.headers.get('ETag')}")
+            else:
+                print(f"❌ Stats not refreshed after the watermark moved: {checked.status_code}")
+        finally:
+            os.chdir(cwd)
+
 def main():
     """Run all blockchain tests"""
     print("🚀 Starting Blockchain Functionality Tests")
@@ -192,9 +1089,40 @@ def main():
         # Test multiple blocks
         blockchain = test_multiple_blocks(blockchain)
 
+        # Test frozen blocks
+        test_frozen_blocks(blockchain)
+
+        # Test compact chain store
+        test_chain_store(blockchain)
+
+        # Test record index
+        test_record_index(blockchain)
+
+        # Test student index
+        test_student_index(blockchain)
+
+        # Test date index
+        test_date_index(blockchain)
+        test_record_pagination(blockchain)
+
+        # Test batch addition
+        test_batch_addition(blockchain)
+
+        # Test single-writer appends
+        test_chain_writer(blockchain)
+
         # Test chain integrity
         test_chain_integrity(blockchain)
 
+        # Test incremental verification
+        test_incremental_integrity(blockchain)
+
+        # Test parallel verification
+        test_parallel_verification(blockchain)
+
+        # Test Merkle proofs
+        test_merkle_proofs(blockchain)
+
         # Test tamper detection
         test_tamper_detection(blockchain)
 
@@ -203,7 +1131,21 @@ def main():
 
         # Test new features
         test_persistence(blockchain)
+        test_streamed_exports(blockchain)
+        test_csv_import(blockchain)
+        test_group_commit(blockchain)
+        test_warm_up(blockchain)
+        test_incremental_backups(blockchain)
+        test_block_log(blockchain)
+        test_shared_log(blockchain)
+        test_tail_reload(blockchain)
+        test_binary_format(blockchain)
+        test_lazy_chain(blockchain)
+        test_checkpoints(blockchain)
         test_analytics(blockchain)
+        test_analytics_state(blockchain)
+        test_attendance_matrix(blockchain)
+        test_cached_stats(blockchain)
 
         print("\n" + "=" * 50)
         print("🎉 All tests completed successfully!")
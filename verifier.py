@@ -0,0 +1,201 @@
+"""
+Blockchain Verifier Module
+Parallel integrity verification that hashes chunks of the chain in a process pool.
+The workers inherit the chain when they start, so tasks only carry block ranges.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from block import compute_hash
+from chainwriter import ChainSnapshot
+
+# Chains shorter than this are cheaper to verify in a single process
+PARALLEL_THRESHOLD = 20000
+CHUNK_SIZE = 5000
+# Blocks appended since the workers started that are sent along with the
+# tasks; once more have piled up the pool starts workers that inherit them
+REFRESH_BLOCKS = CHUNK_SIZE
+
+# The chain a worker process inherited when its pool started it
+_worker_chain = None
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def should_verify_in_parallel(chain, workers=None):
+    """
+    Decide whether a chain is long enough, and the machine wide enough, to use the pool
+    """
+    if workers is None:
+        workers = default_workers()
+    return workers > 1 and len(chain) >= PARALLEL_THRESHOLD
+
+
+def _context():
+    # Forked workers share the parent's chain instead of unpickling a copy of it
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def _install_chain(chain):
+    global _worker_chain
+    _worker_chain = chain
+
+
+def _chunk_fields(chain, start, stop):
+    return [(block.index, block.timestamp, block.data, block.prev_hash, block.hash)
+            for block in chain[start:stop]]
+
+
+def _verify_chunk(start, stop, previous, fields=None):
+    """
+    Find the first failing block in a chunk, checking the same conditions in the
+    same order as check_integrity. previous is the (index, hash) of the block
+    before the chunk so the link across the chunk boundary is checked too.
+    fields are given for blocks the worker didn't inherit.
+    """
+    if fields is None:
+        fields = _chunk_fields(_worker_chain, start, stop)
+    for offset, (index, timestamp, data, prev_hash, block_hash) in enumerate(fields):
+        i = start + offset
+        if compute_hash(index, timestamp, data, prev_hash) != block_hash:
+            return f"Error: Block #{i} has invalid hash"
+
+        if previous is not None:
+            previous_index, previous_hash = previous
+            if prev_hash != previous_hash:
+                return f"Error: Block #{i} is not properly linked to previous block #{i-1}"
+            if index != previous_index + 1:
+                return f"Error: Block #{i} has incorrect index. Expected {previous_index + 1}, got {index}"
+
+        previous = (index, block_hash)
+    return None
+
+
+def _invalid_in_chunk(start, stop, fields=None):
+    if fields is None:
+        fields = _chunk_fields(_worker_chain, start, stop)
+    return [start + offset
+            for offset, (index, timestamp, data, prev_hash, block_hash) in enumerate(fields)
+            if compute_hash(index, timestamp, data, prev_hash) != block_hash]
+
+
+def _chunks(chain, chunk_size):
+    for start in range(0, len(chain), chunk_size):
+        yield start, min(start + chunk_size, len(chain))
+
+
+class VerifierPool:
+    """
+    Process pool whose workers inherit the chain when they start, so verifying
+    it only sends them (start, stop) ranges. The workers are kept while the
+    chain verified next extends the one they inherited: blocks appended since
+    are sent along with the tasks, and new workers are started once more than
+    REFRESH_BLOCKS have piled up or the chain was replaced.
+    Keeping workers assumes blocks are never changed in place, as for the
+    server's chain, which is only ever appended to or replaced.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or default_workers()
+        self._executor = None
+        # The chain the workers inherited, and its length and tip hash at the time
+        self._chain = None
+        self._length = 0
+        self._tip = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _inherited(self, chain):
+        """
+        Return how many leading blocks of chain the workers hold, starting new
+        workers first if they don't hold enough of it
+        """
+        base = chain.chain if isinstance(chain, ChainSnapshot) else chain
+        if (self._executor is None or base is not self._chain or len(chain) < self._length
+                or len(chain) - self._length > REFRESH_BLOCKS
+                or (self._length and chain[self._length - 1].hash != self._tip)):
+            self.close()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_context(),
+                                                 initializer=_install_chain, initargs=(chain,))
+            self._chain = base
+            self._length = len(chain)
+            self._tip = chain[-1].hash if chain else None
+        return self._length
+
+    def _sent_fields(self, chain, start, stop, inherited):
+        return None if stop <= inherited else _chunk_fields(chain, start, stop)
+
+    def find_first_failure(self, chain, chunk_size=CHUNK_SIZE):
+        """
+        Verify hashes, links and indexes of every block in parallel.
+        Returns the message for the first failing block, or None when the chain is valid.
+        """
+        with self._lock:
+            inherited = self._inherited(chain)
+            futures = []
+            for start, stop in _chunks(chain, chunk_size):
+                previous = (chain[start - 1].index, chain[start - 1].hash) if start > 0 else None
+                futures.append(self._executor.submit(_verify_chunk, start, stop, previous,
+                                                     self._sent_fields(chain, start, stop, inherited)))
+
+            # Chunks are checked in chain order, so the first failure found is the first in the chain
+            for position, future in enumerate(futures):
+                failure = future.result()
+                if failure:
+                    for pending in futures[position + 1:]:
+                        pending.cancel()
+                    return failure
+        return None
+
+    def find_invalid_blocks(self, chain, chunk_size=CHUNK_SIZE):
+        """
+        Return the positions of all blocks whose stored hash doesn't match their contents
+        """
+        with self._lock:
+            inherited = self._inherited(chain)
+            futures = [self._executor.submit(_invalid_in_chunk, start, stop,
+                                             self._sent_fields(chain, start, stop, inherited))
+                       for start, stop in _chunks(chain, chunk_size)]
+            invalid = []
+            for future in futures:
+                invalid.extend(future.result())
+        return invalid
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        self._chain = None
+
+
+def find_first_failure(chain, workers=None, chunk_size=CHUNK_SIZE, pool=None):
+    """
+    Verify hashes, links and indexes of every block in parallel, in pool or in
+    workers started for this check only.
+    Returns the message for the first failing block, or None when the chain is valid.
+    """
+    if pool is not None:
+        return pool.find_first_failure(chain, chunk_size)
+    with VerifierPool(workers) as pool:
+        return pool.find_first_failure(chain, chunk_size)
+
+
+def find_invalid_blocks(chain, workers=None, chunk_size=CHUNK_SIZE, pool=None):
+    """
+    Return the positions of all blocks whose stored hash doesn't match their contents
+    """
+    if pool is not None:
+        return pool.find_invalid_blocks(chain, chunk_size)
+    with VerifierPool(workers) as pool:
+        return pool.find_invalid_blocks(chain, chunk_size)
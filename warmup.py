@@ -0,0 +1,79 @@
+"""
+Blockchain Warm-up Module
+Runs the slow startup work on a background thread and reports its progress,
+so the server can accept requests while the chain is still being loaded
+"""
+
+import threading
+import time
+
+
+class WarmUp:
+    """
+    Runs target(warm_up) on a background thread. The target announces each
+    phase it enters with begin() and may return a note on the last one; ready
+    is set once it returns. If it raises, the warm-up stops in the "failed"
+    phase and keeps the error.
+    """
+
+    def __init__(self, target):
+        self._target = target
+        self.phase = "starting"
+        self.error = None
+        self.ready = threading.Event()
+        self.finished = threading.Event()
+
+        # Completed phases with their notes and durations
+        self.history = []
+        self._started = None
+        self._phase_started = None
+        self._ended = None
+        self._thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+
+    def start(self):
+        self._started = self._phase_started = time.monotonic()
+        self._thread.start()
+        return self
+
+    def begin(self, phase, note=None):
+        """
+        Start the next phase; note describes how the previous one ended
+        """
+        self._end_phase(note)
+        self.phase = phase
+
+    def wait(self, timeout=None):
+        """
+        Wait until the warm-up has finished; returns whether the server is ready
+        """
+        self.finished.wait(timeout)
+        return self.ready.is_set()
+
+    def status(self):
+        now = self._ended or time.monotonic()
+        return {
+            "ready": self.ready.is_set(),
+            "phase": self.phase,
+            "elapsed_seconds": round(now - self._started, 3) if self._started else 0.0,
+            "phase_seconds": round(now - self._phase_started, 3) if self._phase_started else 0.0,
+            "completed": list(self.history),
+            "error": self.error
+        }
+
+    def _end_phase(self, note):
+        now = time.monotonic()
+        if self.phase != "starting":
+            self.history.append({"phase": self.phase, "seconds": round(now - self._phase_started, 3),
+                                 "note": note})
+        self._phase_started = now
+
+    def _run(self):
+        try:
+            self.begin("ready", self._target(self))
+            self.ready.set()
+        except Exception as e:
+            self.error = f"{self.phase}: {str(e)}"
+            self.phase = "failed"
+        finally:
+            self._ended = time.monotonic()
+            self.finished.set()